@@ -0,0 +1,90 @@
+from time import time
+from typing import TYPE_CHECKING
+
+import matplotlib.animation as animation
+import matplotlib.pyplot as plt
+import numpy as np
+from animate_joint import FrameRate
+from ring_buffer import RingBuffer
+
+if TYPE_CHECKING:
+    from kaspersmicrobit import KaspersMicrobit
+
+# Estilo das curvas de cada eixo
+AXES_STYLE = (
+    dict(color="red", label="x", linestyle="dashed", linewidth=0.5),
+    dict(color="green", label="y", linestyle="dashed", linewidth=0.5),
+    dict(color="blue", label="z", linestyle="dashed", linewidth=0.5),
+)
+
+
+# Histórico das leituras do acelerômetro de um microbit
+class Acc:
+    def __init__(self, microbit: "KaspersMicrobit", capacity: int):
+        self.microbit = microbit
+        self.history = RingBuffer(capacity, width=3, dtype=np.int16)
+
+    def update(self):
+        data = self.microbit.accelerometer.read()
+        self.history.append(time(), (data.x, data.y, data.z))
+
+
+# Gráfico ao vivo do acelerômetro de cada microbit, um painel por microbit
+class AccelerometerAnimation:
+    def __init__(
+        self,
+        *microbits: "KaspersMicrobit",
+        exhibition_time: float = 20,
+        clock: float = 0.01,
+        frames: int = 1500,
+        ylim=(-2048, 2048),
+        blit: bool = True,
+    ):
+        self.exhibition_time = exhibition_time
+        self.clock = clock
+        self.frames = frames
+        self.accs = [Acc(mb, int(exhibition_time / clock)) for mb in microbits]
+        self.fig, axs = plt.subplots(len(self.accs), 1, squeeze=False)
+        self.axs = axs[:, 0]
+        # As três curvas de cada painel são criadas uma única vez, com limites
+        # fixos, e apenas seus dados mudam a cada quadro
+        self.lines = []
+        for ax in self.axs:
+            self.lines.append([ax.plot([], [], **style)[0] for style in AXES_STYLE])
+            ax.set_xlim(-exhibition_time, 0)
+            ax.set_ylim(ylim)
+            ax.legend(loc="upper left")
+        self.fps_text = self.axs[0].text(
+            0.98, 0.9, "", transform=self.axs[0].transAxes, ha="right"
+        )
+        self.frame_rate = FrameRate()
+        self.blit = blit and self.fig.canvas.supports_blit
+
+    @property
+    def fps(self):
+        return self.frame_rate.fps
+
+    # Mostra no painel `index` as amostras (n, 3) tomadas em `times`, com o
+    # eixo do tempo relativo a `now` (por padrão, a amostra mais recente)
+    def show(self, index: int, times, values, now: float | None = None):
+        times = times - (times[-1] if now is None else now)
+        for axis, line in enumerate(self.lines[index]):
+            line.set_data(times, values[:, axis])
+
+    def update(self, frame):
+        for index, acc in enumerate(self.accs):
+            acc.update()
+            self.show(index, acc.history.times(), acc.history.values())
+        self.fps_text.set_text(f"{self.frame_rate.tick():.1f} fps")
+        return (*(line for lines in self.lines for line in lines), self.fps_text)
+
+    def animate(self):
+        self.animation = animation.FuncAnimation(
+            self.fig,
+            self.update,
+            interval=self.clock * 1000,
+            repeat=False,
+            frames=self.frames,
+            blit=self.blit,
+        )
+        plt.show()
@@ -1,11 +1,34 @@
+from time import perf_counter, time
+
 import matplotlib.animation as animation
 import matplotlib.pyplot as plt
-import numpy as np
 from joint_tracker import JointTracker
+from kinematics import KinematicChain
+
+
+# Mede a taxa de quadros efetivamente alcançada, atualizada a cada `period`
+# segundos
+class FrameRate:
+    def __init__(self, period: float = 1.0):
+        self.period = period
+        self.fps = 0.0
+        self.frames = 0
+        self.start = perf_counter()
+
+    def tick(self):
+        self.frames += 1
+        elapsed = perf_counter() - self.start
+        if elapsed >= self.period:
+            self.fps = self.frames / elapsed
+            self.frames = 0
+            self.start = perf_counter()
+        return self.fps
 
 
 class JointAnimation:
-    def __init__(self, joint_tracker: JointTracker, lenghts, frames, xyz_lim):
+    def __init__(
+        self, joint_tracker: JointTracker, lenghts, frames, xyz_lim, blit: bool = True
+    ):
         self.joint_tracker = joint_tracker
         self.lengths = lenghts
         self.frames = frames
@@ -13,23 +36,102 @@ class JointAnimation:
         self.fig = plt.figure()
         self.ax = self.fig.add_subplot(111, projection="3d")
         self.xyz_lim = xyz_lim
-
-    def update(self, frame):
-        self.frame = frame
-        self.joint_tracker.update()
-        self.ax.clear()
+        # Os limites dos eixos são fixos, então o fundo pode ser reaproveitado
+        # entre quadros
         self.ax.set_xlim(self.xyz_lim[0])
         self.ax.set_ylim(self.xyz_lim[1])
         self.ax.set_zlim(self.xyz_lim[2])
-        last_point = np.array([0, 0, 0])
-        for vector, length in zip(self.joint_tracker.vectors, self.lengths):
-            self.ax.quiver(*last_point, *vector * length)
-            last_point = last_point + vector * length
-        return
+        # A cadeia inteira é um único artista, criado uma vez, cujos pontos são
+        # as posições das juntas; o custo por quadro não cresce com o número
+        # de segmentos
+        self.chain = KinematicChain(self.lengths)
+        self.segments = self.ax.plot([], [], [], marker="o")[0]
+        self.fps_text = self.ax.text2D(0.02, 0.95, "", transform=self.ax.transAxes)
+        self.frame_rate = FrameRate()
+        self.blit = blit and self.fig.canvas.supports_blit
+        # Com blit, os artistas ficam fora do fundo salvo desde o início, mesmo
+        # que os primeiros quadros não desenhem nada
+        self.segments.set_animated(self.blit)
+        self.fps_text.set_animated(self.blit)
+        # Último quadro lido do tracker, revisão do quadro desenhado e número
+        # de quadros desenhados
+        self.snapshot = None
+        self.revision = None
+        self.drawn = 0
+        # Animação e temporizador que a acorda quando ela está parada à espera
+        # de uma revisão nova (ver update)
+        self.animation = None
+        self.wake_timer = None
+
+    @property
+    def fps(self):
+        return self.frame_rate.fps
+
+    # Atualiza a cadeia desenhada para as orientações (N, 3, 3) dadas
+    def show(self, rotations):
+        self.chain.set_rotations(rotations)
+        self.segments.set_data_3d(*self.chain.positions.T)
+
+    # Lê o quadro mais recente e retorna se ele precisa ser desenhado, isto é,
+    # se sua revisão ainda não foi mostrada (ver JointTracker.dead_band)
+    def poll(self):
+        # Se a aquisição roda em segundo plano, apenas lê o quadro mais recente
+        if not self.joint_tracker.running:
+            self.joint_tracker.update()
+        self.snapshot = self.joint_tracker.latest()
+        changed = self.snapshot is not None and self.snapshot.revision != self.revision
+        if not changed:
+            self.joint_tracker.instrumentation.tick("skipped")
+        return changed
+
+    # Desenha o quadro mais recente. Se a revisão já foi mostrada, os artistas
+    # são retornados sem mudança (com blit, só são copiados de novo sobre o
+    # fundo salvo) e a animação para; o temporizador de _wake passa a só
+    # consultar o tracker, sem desenhar, até chegar uma revisão nova.
+    def update(self, frame):
+        self.frame = frame
+        if not self.poll():
+            if self.animation is not None:
+                self.animation.event_source.stop()
+                self.wake_timer.start()
+            return self.segments, self.fps_text
+        snapshot = self.snapshot
+        draw_start = perf_counter()
+        self.show(snapshot.rotations)
+        self.revision = snapshot.revision
+        self.drawn += 1
+        self.fps_text.set_text(f"{self.frame_rate.tick():.1f} fps")
+        # Tempo de atualização dos artistas, idade dos dados exibidos e taxa de
+        # quadros da tela
+        instrumentation = self.joint_tracker.instrumentation
+        instrumentation.record("draw", perf_counter() - draw_start)
+        # A idade é medida no relógio dos instantes das amostras
+        instrumentation.record("staleness", time() - snapshot.timestamp)
+        instrumentation.tick("display")
+        return self.segments, self.fps_text
+
+    # Números dos quadros da animação: os ticks pulados não contam para o
+    # limite de `frames` quadros desenhados
+    def _frame_numbers(self):
+        while self.frames is None or self.drawn < self.frames:
+            yield self.drawn
+
+    def _wake(self):
+        if self.poll():
+            self.wake_timer.stop()
+            self.animation.event_source.start()
 
     def animate(self):
         self.animation = animation.FuncAnimation(
-            self.fig, self.update, repeat=False, frames=self.frames
+            self.fig,
+            self.update,
+            frames=self._frame_numbers(),
+            repeat=False,
+            blit=self.blit,
+            cache_frame_data=False,
+        )
+        self.wake_timer = self.fig.canvas.new_timer(
+            interval=self.animation.event_source.interval
         )
+        self.wake_timer.add_callback(self._wake)
         plt.show()
-#
\ No newline at end of file
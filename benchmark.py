@@ -0,0 +1,192 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from os import scandir
+from tempfile import TemporaryDirectory
+from time import perf_counter, sleep
+
+import numpy as np
+from joint_tracker import JointTracker
+from offline import iter_joint_vectors
+from recording import Characteristic, record_microbits
+from simulation import SimulatedMicrobit
+
+
+def simulated_microbits(devices: int, latency: float, jitter: float):
+    return [
+        SimulatedMicrobit(str(i), latency=latency, jitter=jitter, seed=i)
+        for i in range(devices)
+    ]
+
+
+# Quadros por segundo do JointTracker em função do número de microbits, para
+# cada modo de leitura. A aquisição roda na thread do próprio tracker e só
+# contam os quadros produzidos, isto é, com ao menos uma amostra nova; também
+# é informada a taxa de amostras novas de cada microbit.
+def benchmark_tracker(
+    device_counts=(2, 3, 4, 8),
+    latency: float = 0.01,
+    jitter: float = 0.002,
+    duration: float = 2.0,
+):
+    results = []
+    for devices in device_counts:
+        for mode in ("sequential", "concurrent", "streaming"):
+            tracker = JointTracker(
+                *simulated_microbits(devices, latency, jitter),
+                concurrent=mode == "concurrent",
+                streaming=mode == "streaming",
+            )
+            if mode == "streaming":
+                # Espera as primeiras notificações
+                sleep(0.1)
+            tracker.start()
+            start = perf_counter()
+            sleep(duration)
+            tracker.stop()
+            elapsed = perf_counter() - start
+            frames = tracker.produced
+            summary = tracker.instrumentation.summary()
+            tracker.close()
+            for mb in tracker.microbits:
+                mb.disconnect()
+            results.append(
+                {
+                    "devices": devices,
+                    "mode": mode,
+                    "frames_per_second": frames / elapsed,
+                    "samples_per_second": [
+                        summary["rates_hz"].get(address) for address in tracker.addresses
+                    ],
+                    "math": summary["stages"].get("math"),
+                    "spread": summary["stages"].get("spread"),
+                }
+            )
+    return results
+
+
+# Amostras (quadros de N microbits) por segundo do cálculo offline de vetores
+# e ângulos
+def benchmark_offline(
+    samples: int = 1_000_000, devices: int = 3, chunk_size: int = 65536, repeat: int = 3
+):
+    rng = np.random.default_rng(0)
+    magnetometer = rng.normal(0, 400, (samples, devices, 3))
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in iter_joint_vectors(magnetometer, chunk_size):
+            pass
+        best = min(best, perf_counter() - start)
+    return {
+        "samples": samples,
+        "devices": devices,
+        "chunk_size": chunk_size,
+        "samples_per_second": samples / best,
+    }
+
+
+# Quadros por segundo de JointAnimation desenhando com o backend Agg, sem
+# janela; os microbits simulados não têm latência, então mede só o desenho
+def benchmark_animation(devices: int = 3, frames: int = 200):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from animate_joint import JointAnimation
+
+    tracker = JointTracker(*simulated_microbits(devices, 0.0, 0.0))
+    # Sem blit: cada canvas.draw() desenha a figura inteira, com a cadeia; com
+    # blit os artistas animados ficariam fora do desenho medido
+    joint_animation = JointAnimation(
+        tracker,
+        [1] * devices,
+        frames=frames,
+        xyz_lim=[[-devices, devices]] * 3,
+        blit=False,
+    )
+    canvas = joint_animation.fig.canvas
+    start = perf_counter()
+    for frame in range(frames):
+        joint_animation.update(frame)
+        canvas.draw()
+    elapsed = perf_counter() - start
+    summary = tracker.instrumentation.summary()
+    plt.close(joint_animation.fig)
+    tracker.close()
+    return {
+        "devices": devices,
+        "frames": frames,
+        "frames_per_second": frames / elapsed,
+        "draw": summary["stages"].get("draw"),
+    }
+
+
+# Amostras gravadas por segundo por record_microbits com microbits simulados
+def benchmark_recorder(
+    devices: int = 2,
+    duration: float = 2.0,
+    latency: float = 0.001,
+    jitter: float = 0.0,
+    rate: float = 1000.0,
+):
+    characteristics = [Characteristic.ACCELEROMETER, Characteristic.MAGNETOMETER]
+    with TemporaryDirectory() as directory:
+        start = perf_counter()
+        session = record_microbits(
+            *simulated_microbits(devices, latency, jitter),
+            characteristics=characteristics,
+            time_length=duration,
+            verbose=False,
+            directory=directory,
+            rates={characteristic: rate for characteristic in characteristics},
+        )
+        elapsed = perf_counter() - start
+        samples = sum(
+            len(data[characteristic])
+            for data in session
+            for characteristic in characteristics
+        )
+        del session
+        size = sum(entry.stat().st_size for entry in scandir(directory))
+    return {
+        "devices": devices,
+        "requested_rate": rate,
+        "samples": samples,
+        "samples_per_second": samples / elapsed,
+        "bytes_per_second": size / elapsed,
+    }
+
+
+def run(quick: bool = False):
+    duration = 0.5 if quick else 2.0
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "tracker": benchmark_tracker(
+            (2, 4) if quick else (2, 3, 4, 8), duration=duration
+        ),
+        "offline": benchmark_offline(100_000 if quick else 1_000_000),
+        "animation": benchmark_animation(frames=50 if quick else 200),
+        "recorder": benchmark_recorder(duration=duration),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Hardware-free benchmarks of tracker, offline math, animation and recorder."
+    )
+    parser.add_argument("-o", "--output", help="JSON file for the results (default: stdout)")
+    parser.add_argument("--quick", action="store_true", help="shorter runs")
+    args = parser.parse_args()
+    results = run(args.quick)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
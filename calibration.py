@@ -0,0 +1,102 @@
+import json
+from os import path
+from time import time
+
+import numpy as np
+from recording import Characteristic, load_session, session_addresses
+
+
+# Guarda em disco resultados de calibração por endereço de microbit, cada um
+# com o instante em que foi obtido. Valores mais velhos que `validity`
+# segundos são ignorados (validity=None: nunca expiram).
+class CalibrationCache:
+    def __init__(self, file_name: str = "calibration.json", validity: float | None = 3600):
+        self.file_name = file_name
+        self.validity = validity
+        self.entries = {}
+        if path.exists(file_name):
+            with open(file_name) as file:
+                self.entries = json.load(file)
+
+    def get(self, address: str, key: str):
+        entry = self.entries.get(address, {}).get(key)
+        if entry is None:
+            return None
+        if self.validity is not None and time() - entry["time"] > self.validity:
+            return None
+        return entry["value"]
+
+    def set(self, address: str, key: str, value):
+        self.entries.setdefault(address, {})[key] = {"value": value, "time": time()}
+        with open(self.file_name, "w") as file:
+            json.dump(self.entries, file, indent=2)
+
+    def get_magnetometer(self, address: str):
+        values = self.get(address, "magnetometer")
+        return None if values is None else MagnetometerCalibration.from_dict(values)
+
+    def set_magnetometer(self, address: str, calibration: "MagnetometerCalibration"):
+        self.set(address, "magnetometer", calibration.to_dict())
+
+
+# Correção de ferro duro (offset) e ferro mole (matriz) do magnetômetro:
+# corrigido = matrix @ (bruto - offset)
+class MagnetometerCalibration:
+    def __init__(self, offset=(0, 0, 0), matrix=np.eye(3)):
+        self.offset = np.asarray(offset, dtype=float)
+        self.matrix = np.asarray(matrix, dtype=float)
+
+    # Aceita uma amostra (3,) ou um bloco (..., 3) de amostras
+    def apply(self, samples):
+        return (np.asarray(samples, dtype=float) - self.offset) @ self.matrix.T
+
+    def to_dict(self):
+        return {"offset": self.offset.tolist(), "matrix": self.matrix.tolist()}
+
+    @staticmethod
+    def from_dict(values: dict):
+        return MagnetometerCalibration(values["offset"], values["matrix"])
+
+
+# Ajusta um elipsoide às amostras (n, 3) de uma varredura do magnetômetro em
+# todas as orientações. O centro do elipsoide é o offset de ferro duro e a
+# matriz leva o elipsoide a uma esfera, preservando o raio médio.
+def fit_magnetometer(samples):
+    samples = np.asarray(samples, dtype=float)
+    if len(samples) < 9:
+        raise ValueError("At least 9 samples are needed to fit the calibration.")
+    x, y, z = samples.T
+    # a x² + b y² + c z² + 2d xy + 2e xz + 2f yz + 2g x + 2h y + 2i z = 1
+    design = np.column_stack(
+        (x * x, y * y, z * z, 2 * x * y, 2 * x * z, 2 * y * z, 2 * x, 2 * y, 2 * z)
+    )
+    a, b, c, d, e, f, g, h, i = np.linalg.lstsq(design, np.ones(len(samples)), rcond=None)[0]
+    quadric = np.array([[a, d, e], [d, b, f], [e, f, c]])
+    offset = -np.linalg.solve(quadric, [g, h, i])
+    # Com o centro na origem: (v - offset)ᵀ Q (v - offset) = scale
+    scale = 1 + offset @ quadric @ offset
+    eigenvalues, eigenvectors = np.linalg.eigh(quadric / scale)
+    if np.any(eigenvalues <= 0):
+        raise ValueError("The samples do not describe an ellipsoid.")
+    # Raiz da forma quadrática: leva o elipsoide à esfera unitária
+    matrix = eigenvectors @ np.diag(np.sqrt(eigenvalues)) @ eigenvectors.T
+    radius = np.prod(1 / np.sqrt(eigenvalues)) ** (1 / 3)
+    return MagnetometerCalibration(offset, matrix * radius)
+
+
+# Ajusta a calibração a partir do magnetômetro de uma sessão gravada por
+# record_microbits
+def fit_session(directory: str, device: int = 0):
+    return fit_magnetometer(load_session(directory)[device][Characteristic.MAGNETOMETER])
+
+
+# Ajusta a calibração do magnetômetro de cada microbit de uma sessão e a guarda
+# no cache pelo endereço gravado na sessão, de onde JointTracker e
+# offline.process_session a leem. Retorna as calibrações na ordem da sessão.
+def calibrate_session(directory: str, cache: CalibrationCache):
+    calibrations = []
+    for address, data in zip(session_addresses(directory), load_session(directory)):
+        calibration = fit_magnetometer(data[Characteristic.MAGNETOMETER])
+        cache.set_magnetometer(address, calibration)
+        calibrations.append(calibration)
+    return calibrations
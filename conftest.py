@@ -0,0 +1,2 @@
+# old/ guarda os scripts originais, que não são testes
+collect_ignore = ["old"]
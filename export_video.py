@@ -0,0 +1,233 @@
+import subprocess
+from collections import deque
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+from kinematics import segment_rotations
+from recording import Characteristic, load_session, sample_times
+from resample import align, common_time_base
+
+# Estado de cada processo de renderização, criado uma vez por processo
+_renderer = None
+
+
+# Desenha quadros da JointAnimation a partir de orientações já calculadas,
+# recebidas junto com cada bloco de quadros. `origin` é o instante do primeiro
+# quadro do vídeo.
+class JointRenderer:
+    def __init__(self, origin, lengths, xyz_lim, size, dpi):
+        from animate_joint import JointAnimation
+
+        self.origin = origin
+        self.animation = JointAnimation(None, lengths, None, xyz_lim, blit=False)
+        self.figure = self.animation.fig
+        self.figure.set_size_inches(size)
+        self.figure.set_dpi(dpi)
+
+    def draw(self, time: float, rotations):
+        self.animation.show(rotations)
+        self.animation.fps_text.set_text(f"{time - self.origin:.2f} s")
+
+
+# Desenha quadros da AccelerometerAnimation lendo a sessão diretamente: cada
+# quadro mostra os últimos `exhibition_time` segundos antes do seu instante
+class AccelerometerRenderer:
+    def __init__(self, origin, directory, exhibition_time, ylim, size, dpi):
+        from animate_accelerometer import AccelerometerAnimation
+
+        self.origin = origin
+        self.exhibition_time = exhibition_time
+        session = load_session(directory)
+        self.samples = [
+            (
+                sample_times(data, Characteristic.ACCELEROMETER),
+                data[Characteristic.ACCELEROMETER],
+            )
+            for data in session
+        ]
+        self.animation = AccelerometerAnimation(
+            *[None] * len(session),
+            exhibition_time=exhibition_time,
+            frames=None,
+            ylim=ylim,
+            blit=False,
+        )
+        self.figure = self.animation.fig
+        self.figure.set_size_inches(size)
+        self.figure.set_dpi(dpi)
+
+    def draw(self, now: float):
+        for index, (times, values) in enumerate(self.samples):
+            start = np.searchsorted(times, now - self.exhibition_time)
+            stop = np.searchsorted(times, now, side="right")
+            if stop > start:
+                self.animation.show(index, times[start:stop], values[start:stop], now)
+        self.animation.fps_text.set_text(f"{now - self.origin:.2f} s")
+
+
+def _init_worker(renderer, arguments):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    global _renderer
+    _renderer = renderer(*arguments)
+
+
+# Renderiza um bloco de quadros, dado por arrays cujo primeiro eixo é o quadro
+# (o primeiro deles com os instantes), e retorna seus pixels RGBA concatenados
+def _render_block(block):
+    canvas = _renderer.figure.canvas
+    frames = []
+    for frame in zip(*block):
+        _renderer.draw(*frame)
+        canvas.draw()
+        frames.append(bytes(canvas.buffer_rgba()))
+    return b"".join(frames)
+
+
+# Para cada tipo: número de quadros do vídeo, blocos de até `chunk_size`
+# quadros (gerados sob demanda, então só os blocos em andamento ficam em
+# memória) e argumentos do renderizador
+def _joint_frames(directory, fps, chunk_size, lengths, xyz_lim, calibrations):
+    session = load_session(directory)
+    devices = [data[Characteristic.MAGNETOMETER] for data in session]
+    times = [
+        sample_times(data, Characteristic.MAGNETOMETER)[: len(magnetometer)]
+        for data, magnetometer in zip(session, devices)
+    ]
+    frame_times = common_time_base(times, fps)
+    if not len(frame_times):
+        return 0, None, None
+
+    def blocks():
+        for chunk_times, magnetometer in align(times, devices, fps, chunk_size):
+            for device, calibration in enumerate(calibrations or []):
+                if calibration is not None:
+                    magnetometer[:, device] = calibration.apply(magnetometer[:, device])
+            yield chunk_times, segment_rotations(magnetometer)
+
+    lengths = lengths or [1] * len(devices)
+    xyz_lim = xyz_lim or [[-sum(lengths), sum(lengths)]] * 3
+    return len(frame_times), blocks(), (frame_times[0], lengths, xyz_lim)
+
+
+def _accelerometer_frames(directory, fps, chunk_size, exhibition_time, ylim):
+    times = [
+        sample_times(data, Characteristic.ACCELEROMETER)
+        for data in load_session(directory)
+    ]
+    times = [t for t in times if t is not None and len(t)]
+    if not times:
+        return 0, None, None
+    start = min(float(t[0]) for t in times)
+    stop = max(float(t[-1]) for t in times)
+    frame_times = start + np.arange(int((stop - start) * fps) + 1) / fps
+    blocks = (
+        (frame_times[block : block + chunk_size],)
+        for block in range(0, len(frame_times), chunk_size)
+    )
+    return len(frame_times), blocks, (start, directory, exhibition_time, ylim)
+
+
+# Tamanho em pixels dos quadros renderizados com `size` polegadas e `dpi`,
+# medido no canvas Agg como nos processos de renderização. O yuv420p guarda a
+# cor em meia resolução, então o libx264 recusa larguras e alturas ímpares.
+def _frame_size(size, dpi):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    width, height = FigureCanvasAgg(Figure(figsize=size, dpi=dpi)).get_width_height()
+    if width % 2 or height % 2:
+        raise ValueError(
+            f"The frame size {width}x{height} must be even; change size or dpi."
+        )
+    return width, height
+
+
+# Exporta uma sessão gravada por record_microbits para um vídeo, sem janela e
+# sem microbits. Os quadros são divididos em blocos de `chunk_size`,
+# renderizados em paralelo por `workers` processos com o backend Agg e
+# enviados em ordem para um único ffmpeg. Só alguns blocos ficam em memória
+# ao mesmo tempo, então a duração da sessão não é limitada pela RAM.
+def export_video(
+    directory: str,
+    file_name: str,
+    kind: str = "joint",
+    fps: float = 30,
+    workers: int | None = None,
+    chunk_size: int = 16,
+    size=(6.4, 4.8),
+    dpi: int = 100,
+    lengths=None,
+    xyz_lim=None,
+    calibrations=None,
+    exhibition_time: float = 20,
+    ylim=(-2048, 2048),
+    ffmpeg: str = "ffmpeg",
+    codec: str = "libx264",
+):
+    match kind:
+        case "joint":
+            renderer = JointRenderer
+            frames, blocks, arguments = _joint_frames(
+                directory, fps, chunk_size, lengths, xyz_lim, calibrations
+            )
+        case "accelerometer":
+            renderer = AccelerometerRenderer
+            frames, blocks, arguments = _accelerometer_frames(
+                directory, fps, chunk_size, exhibition_time, ylim
+            )
+        case _:
+            raise ValueError(f"Invalid kind {kind}, it should be either joint or accelerometer.")
+    if arguments is None:
+        raise ValueError("The session has no samples to export.")
+    arguments = (*arguments, size, dpi)
+    width, height = _frame_size(size, dpi)
+    workers = workers or cpu_count()
+
+    encoder = subprocess.Popen(
+        [
+            ffmpeg,
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "rgba",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(fps),
+            "-i",
+            "-",
+            "-c:v",
+            codec,
+            "-pix_fmt",
+            "yuv420p",
+            file_name,
+        ],
+        stdin=subprocess.PIPE,
+    )
+    try:
+        if workers == 1:
+            _init_worker(renderer, arguments)
+            for block in blocks:
+                encoder.stdin.write(_render_block(block))
+        else:
+            with Pool(workers, _init_worker, (renderer, arguments)) as pool:
+                # Mantém no máximo dois blocos por processo em andamento
+                pending = deque()
+                for block in blocks:
+                    pending.append(pool.apply_async(_render_block, (block,)))
+                    if len(pending) > 2 * workers:
+                        encoder.stdin.write(pending.popleft().get())
+                while pending:
+                    encoder.stdin.write(pending.popleft().get())
+    finally:
+        encoder.stdin.close()
+        returncode = encoder.wait()
+    if returncode != 0:
+        raise RuntimeError(f"{ffmpeg} exited with code {returncode}.")
+    return frames
+
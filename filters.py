@@ -0,0 +1,98 @@
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+
+# Filtro de ruído por amostra, aplicado às leituras (N, 3) dos N microbits de
+# cada quadro, com estado de tamanho fixo por microbit. Só os microbits com
+# amostra nova (instante diferente do anterior) atualizam o filtro; os demais
+# repetem a última saída, de modo que ler várias vezes a mesma amostra (como no
+# modo streaming) não altera o resultado.
+class StreamFilter(ABC):
+    def __init__(self):
+        self.timestamps = None
+        self.output = None
+
+    def __call__(self, timestamps, values):
+        timestamps = np.asarray(timestamps, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if self.output is None:
+            self.timestamps = timestamps.copy()
+            self.output = values.copy()
+            self._start(values)
+            return self.output.copy()
+        new = timestamps != self.timestamps
+        if new.any():
+            dt = timestamps[new] - self.timestamps[new]
+            self.output[new] = self._step(new, dt, values[new])
+            self.timestamps[new] = timestamps[new]
+        return self.output.copy()
+
+    def _start(self, values):
+        pass
+
+    # Saídas novas dos microbits com amostra nova (máscara `new`), dados os
+    # intervalos `dt` desde a amostra anterior e os valores novos
+    @abstractmethod
+    def _step(self, new, dt, values):
+        pass
+
+
+# Média móvel exponencial: y = alpha x + (1 - alpha) y
+class EmaFilter(StreamFilter):
+    def __init__(self, alpha: float = 0.3):
+        super().__init__()
+        self.alpha = alpha
+
+    def _step(self, new, dt, values):
+        return self.alpha * values + (1 - self.alpha) * self.output[new]
+
+
+# Filtro "one euro" (Casiez et al., 2012): média exponencial cuja frequência de
+# corte cresce com a velocidade do sinal, suavizando bastante o sensor parado e
+# pouco o sensor em movimento, sem o atraso de um filtro forte fixo
+class OneEuroFilter(StreamFilter):
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 0.05, d_cutoff: float = 1.0):
+        super().__init__()
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.derivative = None
+
+    @staticmethod
+    def _alpha(cutoff, dt):
+        return 1 / (1 + 1 / (2 * np.pi * cutoff * dt))
+
+    def _start(self, values):
+        self.derivative = np.zeros_like(values)
+
+    def _step(self, new, dt, values):
+        dt = np.maximum(dt, 1e-6)[:, None]
+        previous = self.output[new]
+        alpha = self._alpha(self.d_cutoff, dt)
+        derivative = alpha * (values - previous) / dt + (1 - alpha) * self.derivative[new]
+        self.derivative[new] = derivative
+        alpha = self._alpha(self.min_cutoff + self.beta * np.abs(derivative), dt)
+        return alpha * values + (1 - alpha) * previous
+
+
+# Mediana das últimas k amostras de cada microbit, que remove picos isolados
+class MedianFilter(StreamFilter):
+    def __init__(self, k: int = 5):
+        super().__init__()
+        self.k = k
+        self.window = None
+        self.positions = None
+
+    def _start(self, values):
+        self.window = np.repeat(values[None], self.k, axis=0)
+        self.positions = np.zeros(len(values), dtype=int)
+
+    def _step(self, new, dt, values):
+        devices = np.flatnonzero(new)
+        self.window[self.positions[devices], devices] = values
+        self.positions[devices] = (self.positions[devices] + 1) % self.k
+        return np.median(self.window[:, devices], axis=0)
+
+
+FILTERS = {"ema": EmaFilter, "one-euro": OneEuroFilter, "median": MedianFilter}
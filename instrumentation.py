@@ -0,0 +1,131 @@
+import json
+from math import log10
+from time import perf_counter
+
+from status import StatusSink
+
+
+# Histograma de latências com bins logarítmicos (`bins_per_decade` por década
+# entre `min_value` e `max_value` segundos). Adicionar um valor custa um log e
+# um incremento; os percentis são estimados pelos bins.
+class Histogram:
+    def __init__(
+        self,
+        min_value: float = 1e-6,
+        max_value: float = 100.0,
+        bins_per_decade: int = 20,
+    ):
+        self.min_value = min_value
+        self.bins_per_decade = bins_per_decade
+        self.counts = [0] * (int(log10(max_value / min_value) * bins_per_decade) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        if value > self.min_value:
+            index = int(log10(value / self.min_value) * self.bins_per_decade)
+            index = min(index, len(self.counts) - 1)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    # Limite superior do bin onde está o percentil q (0 a 100)
+    def percentile(self, q: float):
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        accumulated = 0
+        for index, count in enumerate(self.counts):
+            accumulated += count
+            if accumulated >= target:
+                upper = self.min_value * 10 ** ((index + 1) / self.bins_per_decade)
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean_ms": self.mean * 1000,
+            "p50_ms": self.percentile(50) * 1000,
+            "p90_ms": self.percentile(90) * 1000,
+            "p99_ms": self.percentile(99) * 1000,
+            "max_ms": self.max * 1000,
+        }
+
+
+# Conta eventos para calcular a taxa média alcançada. Sem `now`, usa
+# perf_counter(); quem passa `now` (por exemplo instantes de amostras) deve
+# usar sempre o mesmo relógio para a mesma taxa.
+class Rate:
+    def __init__(self):
+        self.count = 0
+        self.first = None
+        self.last = None
+
+    def tick(self, now: float | None = None):
+        now = perf_counter() if now is None else now
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.count += 1
+
+    @property
+    def hz(self):
+        if self.count < 2 or self.last == self.first:
+            return 0.0
+        return (self.count - 1) / (self.last - self.first)
+
+
+# Coleção de histogramas por etapa ("read <endereço>", "math", "draw",
+# "staleness", ...) e de taxas por fonte ("frames", endereço de cada microbit,
+# "display", ...)
+class Instrumentation:
+    def __init__(self):
+        self.histograms: dict[str, Histogram] = {}
+        self.rates: dict[str, Rate] = {}
+
+    def record(self, stage: str, seconds: float):
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            histogram = self.histograms.setdefault(stage, Histogram())
+        histogram.add(seconds)
+
+    def tick(self, name: str, now: float | None = None):
+        rate = self.rates.get(name)
+        if rate is None:
+            rate = self.rates.setdefault(name, Rate())
+        rate.tick(now)
+
+    def summary(self):
+        return {
+            "stages": {
+                stage: histogram.summary()
+                for stage, histogram in list(self.histograms.items())
+            },
+            "rates_hz": {name: rate.hz for name, rate in list(self.rates.items())},
+        }
+
+    # Resumo compacto para um StatusSink, enviado só quando o destino permite
+    def report(self, status: StatusSink):
+        if status.due():
+            fields = {
+                f"{stage}_p50_ms": histogram.percentile(50) * 1000
+                for stage, histogram in list(self.histograms.items())
+            }
+            fields.update(
+                {f"{name}_hz": rate.hz for name, rate in list(self.rates.items())}
+            )
+            status.emit(fields)
+
+    def export(self, file_name: str):
+        with open(file_name, "w") as file:
+            json.dump(self.summary(), file, indent=2)
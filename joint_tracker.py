@@ -1,56 +1,216 @@
-from os import system
-from time import sleep
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep, time
+from typing import TYPE_CHECKING, List
 
 import numpy as np
-from kaspersmicrobit import KaspersMicrobit
-from kaspersmicrobit.services.leddisplay import Image
+from calibration import CalibrationCache, MagnetometerCalibration
+from filters import StreamFilter
+from instrumentation import Instrumentation
+from kinematics import (
+    BASE_VECTOR,
+    angle_between,
+    relative_angles,
+    segment_rotations,
+)
+from orientation import OrientationFilter, quaternion_to_matrix
+from replay import ReplayMicrobit
+from resample import resample_slerp
+from ring_buffer import RingBuffer
+from samples import SampleBlock, device_address
+from status import NullStatus, StatusSink
+from streaming import MicrobitStream
 
+if TYPE_CHECKING:
+    from kaspersmicrobit import KaspersMicrobit
 
-# Recebe dois vetores bidimensionais e calcula o ângulo entre eles no
-# sentido antihorário
-def get_angle(v1, v2):
-    # Normaliza os vetores
-    v1_unit = v1 / np.linalg.norm(v1)
-    v2_unit = v2 / np.linalg.norm(v2)
 
-    # Toma o cosseno do ângulo a partir do produto escalar
-    cos_angle = np.dot(v1_unit, v2_unit)
+# Recebe dois vetores bidimensionais, ou dois arrays (N, 2) de vetores, e
+# calcula o ângulo entre eles no sentido antihorário, no intervalo [0, 2π)
+def get_angle(v1, v2):
+    return angle_between(v1, v2)
 
-    # Encontra o ângulo a partir da função arcosseno
-    # no intervalo 0 <= ângulo <= 180
-    angle = np.arccos(cos_angle)
 
-    # Encontra o seno do ângulo através do produto vetorial. Se o seno for
-    # negativo (180 < ângulo < 360), então o ângulo é definido como
-    # 360 - (ângulo encontrado por arcosseno).
-    cross_product = np.cross(v1_unit, v2_unit)
-    if float(cross_product) < 0:
-        angle = 2 * np.pi - angle
-    return angle
+# Estado publicado ao fim de cada quadro
+@dataclass
+class JointSnapshot:
+    frame: int
+    timestamp: float
+    timestamps: np.ndarray
+    rotations: np.ndarray
+    vectors: np.ndarray
+    angles: np.ndarray
+    # Contador de mudanças: só aumenta quando algum segmento se move além da
+    # zona morta. Um consumidor que já mostrou essa revisão pode pular o quadro.
+    revision: int = 0
 
 
 class JointTracker:
-    def __init__(self, *microbits: str | KaspersMicrobit):
+    def __init__(
+        self,
+        *microbits: "str | KaspersMicrobit | ReplayMicrobit",
+        concurrent: bool = False,
+        streaming: bool = False,
+        aligned: bool = False,
+        history_length: int = 2048,
+        status: StatusSink | None = None,
+        instrumentation: Instrumentation | None = None,
+        publisher=None,
+        fusion_gain: float | None = None,
+        noise_filter: StreamFilter | None = None,
+        dead_band: float | None = None,
+    ):
+        # Início da contagem do tempo até o primeiro quadro
+        self.created = perf_counter()
+        self.time_to_first_frame = None
         self.microbits = self.get_connection(microbits)
+        # Endereço de cada microbit como texto, resolvido uma vez (ver
+        # samples.device_address), usado como chave de cache e nos nomes das
+        # etapas e taxas da instrumentação
+        self.addresses = [device_address(mb) for mb in self.microbits]
+        # Orientação (N, 3, 3) e vetor (N, 3) de cada segmento no último quadro
+        self.rotations = None
         self.vectors = []
+        self._angles = None
         self.gravity_north_angle = None
+        # Offsets (N, 3) e matrizes (N, 3, 3) de calibração do magnetômetro de
+        # cada microbit, aplicados a todas as leituras; None enquanto não
+        # houver calibração
+        self.magnetometer_offsets = None
+        self.magnetometer_matrices = None
+        # Histórico dos ângulos entre segmentos consecutivos, um por quadro
+        self.history = RingBuffer(history_length, width=len(self.microbits) - 1)
+        # Instantes (time()) das leituras do último quadro, um por microbit, e a
+        # diferença entre a primeira e a última leitura desse quadro
+        self.timestamps = np.zeros(0)
+        self.time_spread = 0.0
+        # Última amostra de cada sensor de cada microbit, reescrita no mesmo
+        # bloco a cada quadro (uma linha SAMPLE_DTYPE por microbit)
+        self.magnetometer_frame = SampleBlock(len(self.microbits))
+        self.accelerometer_frame = SampleBlock(len(self.microbits))
+        # No modo concorrente as leituras de todos os microbits são disparadas
+        # ao mesmo tempo, cada uma em sua própria thread
+        self.executor = (
+            ThreadPoolExecutor(max_workers=len(self.microbits)) if concurrent else None
+        )
+        # No modo streaming os microbits enviam o magnetômetro por notificação
+        # e cada quadro usa a amostra mais recente de cada um
+        # Com fusion_gain, a orientação de cada microbit vem de um filtro que
+        # combina acelerômetro e magnetômetro, em vez de só o magnetômetro
+        # projetado no plano yz
+        self.orientation_filter = (
+            OrientationFilter(fusion_gain) if fusion_gain is not None else None
+        )
+        # Instantes (N, 2) das amostras de acelerômetro e magnetômetro usadas
+        # pela última atualização do filtro
+        self.fusion_times = None
+        # Sinalizado a cada amostra nova do magnetômetro de qualquer microbit;
+        # no modo streaming a thread de aquisição espera por ele em vez de
+        # recalcular sem parar o mesmo quadro
+        self.new_samples = Event()
+        self.streams = (
+            [
+                MicrobitStream(
+                    mb,
+                    accelerometer=self.orientation_filter is not None,
+                    event=self.new_samples,
+                )
+                for mb in self.microbits
+            ]
+            if streaming
+            else None
+        )
+        # Com aligned (só no modo streaming), cada quadro interpola a amostra
+        # de todos os microbits para um mesmo instante, o mais recente já
+        # coberto por todos, em vez de combinar as últimas amostras recebidas,
+        # que podem ter até um período de diferença entre si
+        if aligned and not streaming:
+            raise ValueError("Aligned frames need streaming=True.")
+        self.aligned = aligned
+        # Com aligned e fusion_gain, o filtro recebe as amostras como chegaram
+        # e o alinhamento é feito nas orientações filtradas: as últimas de cada
+        # microbit, cada uma no instante de sua amostra mais recente, são
+        # interpoladas por slerp para o instante comum (ver _aligned_rotations)
+        self.orientation_histories = (
+            [RingBuffer(8, width=4) for _ in self.microbits]
+            if aligned and self.orientation_filter is not None
+            else None
+        )
+        # Instantes do quadro publicado, um por microbit: os das leituras ou,
+        # com as orientações alinhadas, o instante comum
+        self.frame_timestamps = self.timestamps
+        # Filtro de ruído (filters.StreamFilter) aplicado às leituras do
+        # magnetômetro antes da matemática dos ângulos
+        self.noise_filter = noise_filter
+        # Zona morta em radianos: o quadro só conta como mudança quando algum
+        # segmento girou mais que isso desde o último quadro que mudou
+        self.dead_band = dead_band
+        self.reference_vectors = None
+        self.changed = True
+        self.revision = 0
+        # Último quadro publicado (buffer único sobrescrito pelo produtor) e
+        # contadores de quadros produzidos, consumidos e descartados, isto é,
+        # sobrescritos antes de serem lidos por algum consumidor
+        self.snapshot = None
+        self.snapshot_lock = Lock()
+        self.snapshot_consumed = True
+        self.produced = 0
+        self.consumed = 0
+        self.dropped = 0
+        self.thread = None
+        self.stop_event = Event()
+        # Para onde vão as mensagens de estado; por padrão nenhuma
+        self.status = status or NullStatus()
+        # Tempos por etapa e taxas alcançadas, sempre ligados
+        self.instrumentation = instrumentation or Instrumentation()
+        # Destino opcional de cada quadro além do consumidor local, com um
+        # método publish(snapshot), por exemplo publisher.JointPublisher
+        self.publisher = publisher
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    # Se todos os microbits são gravações que já terminaram (ver
+    # ReplayMicrobit.finished); microbits ao vivo nunca terminam
+    @property
+    def finished(self):
+        return all(getattr(mb, "finished", False) for mb in self.microbits)
+
+    # Calcula de uma vez, e só uma vez por quadro, os ângulos de todos os
+    # segmentos em relação ao primeiro e em relação ao anterior
+    def _joint_angles(self):
+        if self._angles is None:
+            if self.rotations is None:
+                self._angles = (np.zeros(0), np.zeros(0))
+            else:
+                self._angles = (
+                    relative_angles(self.rotations, self.rotations[0]),
+                    relative_angles(self.rotations[1:], self.rotations[:-1]),
+                )
+        return self._angles
 
     @property
     def angles_ref0(self):
-        return [
-            get_angle([vector[1], vector[2]], [self.vectors[0][1], self.vectors[0][2]])
-            for vector in self.vectors
-        ]
+        return self._joint_angles()[0]
 
     @property
     def angles_refn(self):
-        return [
-            get_angle([vector[1], vector[2]], [self.vectors[n][1], self.vectors[n][2]])
-            for n, vector in enumerate(self.vectors[1:])
-        ]
+        return self._joint_angles()[1]
+
+    # Calcula o ângulo entre gravidade e norte do primeiro microbit. Se houver
+    # um valor ainda válido no cache para esse microbit, o ritual do relógio
+    # (12 segundos) é pulado.
+    def startup(self, cache: CalibrationCache | None = None):
+        microbit = self.microbits[0]
+        address = self.addresses[0]
+        if cache is not None:
+            self.gravity_north_angle = cache.get(address, "gravity_north_angle")
+            if self.gravity_north_angle is not None:
+                return
+        from kaspersmicrobit.services.leddisplay import Image
 
-    def startup(self):
         for image in (
             Image.CLOCK1,
             Image.CLOCK2,
@@ -65,109 +225,309 @@ class JointTracker:
             Image.CLOCK11,
             Image.CLOCK12,
         ):
-            self.arm_mb.led.show(image)
+            microbit.led.show(image)
             sleep(1)
-        self.gravity_north_angle = get_angle(
-            self._get_magnetometer(self.microbits[0]),
-            self._get_accelerometer(self.microbits[0]),
+        north = self._get_magnetometer(microbit)
+        gravity = self._get_accelerometer(microbit)
+        # O ângulo é tomado no plano yz, como os demais ângulos do tracker
+        self.gravity_north_angle = float(get_angle(north[1:], gravity[1:]))
+        if cache is not None:
+            cache.set(address, "gravity_north_angle", self.gravity_north_angle)
+
+    def set_magnetometer_calibrations(
+        self, calibrations: List[MagnetometerCalibration | None]
+    ):
+        calibrations = [
+            calibration or MagnetometerCalibration() for calibration in calibrations
+        ]
+        self.magnetometer_offsets = np.array([c.offset for c in calibrations])
+        self.magnetometer_matrices = np.array([c.matrix for c in calibrations])
+
+    # Usa as calibrações do magnetômetro guardadas no cache para cada microbit
+    # (sem correção para os que não tiverem)
+    def load_magnetometer_calibrations(self, cache: CalibrationCache):
+        self.set_magnetometer_calibrations(
+            [cache.get_magnetometer(address) for address in self.addresses]
+        )
+
+    # Aplica as calibrações a um quadro (N, 3) de leituras de uma vez
+    def _calibrate_magnetometers(self, norths):
+        if self.magnetometer_matrices is None:
+            return norths
+        return np.einsum(
+            "nij,nj->ni",
+            self.magnetometer_matrices,
+            np.array(norths) - self.magnetometer_offsets,
         )
 
     @staticmethod
-    def _get_accelerometer(mb: KaspersMicrobit):
+    def _get_accelerometer(mb: "KaspersMicrobit"):
         data = mb.accelerometer.read()
-        return np.array([data.x, data.y, data.z])
+        return data.x, data.y, data.z
 
     @staticmethod
-    def _get_magnetometer(mb: KaspersMicrobit):
+    def _get_magnetometer(mb: "KaspersMicrobit"):
         data = mb.magnetometer.read_data()
-        return np.array([data.x, data.y, data.z])
+        return data.x, data.y, data.z
+
+    # Lê um sensor do microbit de índice `device`
+    def _get_timed(self, get, device: int):
+        # O instante da amostra é tomado como o ponto médio da ida e volta BLE.
+        # A duração é medida com perf_counter(), já que time() pode ter
+        # resolução de ~16 ms (Windows); time() só dá o instante da amostra.
+        start = time()
+        clock = perf_counter()
+        value = get(self.microbits[device])
+        elapsed = perf_counter() - clock
+        self.instrumentation.record(f"read {self.addresses[device]}", elapsed)
+        return start + elapsed / 2, value
+
+    def _get_timed_magnetometer(self, device: int):
+        return self._get_timed(self._get_magnetometer, device)
+
+    def _get_timed_accelerometer(self, device: int):
+        return self._get_timed(self._get_accelerometer, device)
 
+    # Lê um sensor de todos os microbits, pelo modo de leitura configurado, e
+    # retorna pares (instante, valor)
+    def _read_all(self, get_timed, sensor: str):
+        if self.streams is not None:
+            readings = [
+                getattr(stream, sensor).latest() or get_timed(device)
+                for device, stream in enumerate(self.streams)
+            ]
+            if not self.aligned or self.orientation_histories is not None:
+                return readings
+            timestamp = min(timestamp for timestamp, _ in readings)
+            return [
+                (timestamp, getattr(stream, sensor).at(timestamp))
+                if getattr(stream, sensor).received
+                else reading
+                for stream, reading in zip(self.streams, readings)
+            ]
+        devices = range(len(self.microbits))
+        if self.executor is None:
+            return [get_timed(device) for device in devices]
+        return list(self.executor.map(get_timed, devices))
+
+    # Escreve as leituras (instante, (x, y, z)) de todos os microbits no quadro
+    # pré-alocado, sem criar arrays por leitura
     @staticmethod
-    def get_connection(microbits: List[KaspersMicrobit | str]):
-        connected_kms: List[KaspersMicrobit] = []
-        for microbit in microbits:
+    def _fill(frame: SampleBlock, readings):
+        frame.clear()
+        for device, (timestamp, (x, y, z)) in enumerate(readings):
+            frame.append((timestamp, x, y, z, device))
+
+    # Retorna uma visão (N, 3) do quadro com a gravidade de cada microbit
+    def _read_accelerometers(self):
+        readings = self._read_all(self._get_timed_accelerometer, "accelerometer")
+        self._fill(self.accelerometer_frame, readings)
+        return self.accelerometer_frame.axes
+
+    # Lê o magnetômetro de todos os microbits e retorna os instantes de cada
+    # leitura e uma visão (N, 3) do quadro com os vetores
+    def _read_magnetometers(self):
+        readings = self._read_all(self._get_timed_magnetometer, "magnetometer")
+        self._fill(self.magnetometer_frame, readings)
+        timestamps = self.magnetometer_frame.times.copy()
+        # Conta apenas amostras novas de cada microbit, para medir a taxa de
+        # amostragem alcançada por dispositivo
+        if len(self.timestamps) == len(timestamps):
+            new = timestamps != self.timestamps
+        else:
+            new = np.ones(len(timestamps), dtype=bool)
+        for address, timestamp, is_new in zip(self.addresses, timestamps, new):
+            if is_new:
+                self.instrumentation.tick(address, timestamp)
+        return timestamps, self.magnetometer_frame.axes
+
+    # Compara os vetores com os do último quadro que mudou. Para vetores
+    # unitários, a distância entre as pontas é 2 sen(θ / 2), onde θ é o ângulo
+    # girado.
+    def _update_changed(self):
+        if self.dead_band is None or self.reference_vectors is None:
+            self.changed = True
+        else:
+            moved = np.linalg.norm(self.vectors - self.reference_vectors, axis=-1).max()
+            self.changed = bool(moved > 2 * np.sin(self.dead_band / 2))
+        if self.changed:
+            self.reference_vectors = self.vectors
+            self.revision += 1
+
+    # Publica o estado do quadro atual, descartando o anterior se ninguém o leu
+    def _publish(self):
+        snapshot = JointSnapshot(
+            self.produced,
+            self.history.last()[0],
+            self.frame_timestamps,
+            self.rotations,
+            self.vectors,
+            self.angles_refn,
+            self.revision,
+        )
+        with self.snapshot_lock:
+            if not self.snapshot_consumed:
+                self.dropped += 1
+            self.snapshot = snapshot
+            self.snapshot_consumed = False
+            self.produced += 1
+        if self.publisher is not None:
+            self.publisher.publish(snapshot)
+        if self.time_to_first_frame is None:
+            self.time_to_first_frame = perf_counter() - self.created
+            self.instrumentation.record("time_to_first_frame", self.time_to_first_frame)
+
+    # Retorna o quadro mais recente sem bloquear à espera de um novo, ou None
+    # se nenhum foi produzido ainda
+    def latest(self):
+        with self.snapshot_lock:
+            if not self.snapshot_consumed:
+                self.snapshot_consumed = True
+                self.consumed += 1
+            return self.snapshot
+
+    # Executa a aquisição continuamente em uma thread separada
+    def start(self):
+        if self.running:
+            return
+        self.stop_event.clear()
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Para sozinha quando as gravações terminam, depois de um último quadro
+    # com as amostras finais
+    def _run(self):
+        while not self.stop_event.is_set():
+            finished = self.finished
+            if self.streams is not None:
+                if not self.new_samples.wait(timeout=0.1) and not finished:
+                    continue
+                # Limpa antes de ler, para não perder amostras que cheguem
+                # durante o quadro
+                self.new_samples.clear()
+            self.update()
+            if finished:
+                break
+
+    def stop(self):
+        if self.thread is not None:
+            self.stop_event.set()
+            self.thread.join()
+            self.thread = None
+
+    def close(self):
+        self.stop()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    # Conecta os microbits dados por endereço (o kaspersmicrobit só é importado
+    # nesse caso) ou por objetos já criados com a mesma interface, como
+    # KaspersMicrobit, ReplayMicrobit ou SimulatedMicrobit
+    @staticmethod
+    def get_connection(microbits: "List[KaspersMicrobit | ReplayMicrobit | str]"):
+        def connect(microbit: "KaspersMicrobit | ReplayMicrobit | str"):
             match microbit:
-                case KaspersMicrobit():
-                    microbit.connect()
-                    connected_kms.append(microbit)
                 case str():
+                    from kaspersmicrobit import KaspersMicrobit
+
                     _microbit = KaspersMicrobit(microbit)
                     _microbit.connect()
-                    connected_kms.append(_microbit)
+                    return _microbit
+                case _ if hasattr(microbit, "connect") and hasattr(microbit, "magnetometer"):
+                    microbit.connect()
+                    return microbit
                 case _:
                     raise TypeError(
-                        f"Invalid type of {microbit}, it should be either KaspersMicrobit or str."
+                        f"Invalid type of {microbit}, it should be either KaspersMicrobit, ReplayMicrobit or str."
                     )
-        return connected_kms
-
-    # Atualiza os vetores para o estado atual
-    def update(self):
-        # Define o vetor no sistema de coordenadas do primeiro segmento da
-        # articulação como [0,-1,0].
-        vectors = [np.array([0, -1, 0])]
-
-        # Define o vetor norte do braço
-        north0 = self._get_magnetometer(self.microbits[0])
-
-        # Projeta o vetor norte do braço no plano yz (plano do braço)
-        north0_yz = np.array([north0[1], north0[2]])
 
-        # Normaliza a projeção do vetor norte no plano yz
-        north0_yz = north0_yz / np.linalg.norm(north0_yz)
-
-        # Executa para cada segmento do braço após o primeiro
-        for microbit in self.microbits[1:]:
-            # Define o vetor norte no sistema de coordenadas do microbit deste
-            # segmento
-            northn = self._get_magnetometer(microbit)
-
-            # Projeta o vetor norte no plano yz no sistema de coordenadas do
-            # microbit deste segmento
-            northn_yz = np.array([northn[1], northn[2]])
-
-            # Encontra o ângulo entre o vetor -y e o vetor norte
-            theta = get_angle(np.array([-1, 0]), northn_yz)
+        # Conecta todos os microbits ao mesmo tempo
+        with ThreadPoolExecutor(max_workers=max(len(microbits), 1)) as executor:
+            connected_kms: "List[KaspersMicrobit | ReplayMicrobit]" = list(
+                executor.map(connect, microbits)
+            )
+        return connected_kms
 
-            # Cria a matriz de rotação em torno do eixo x no sentido horário
-            # por um ângulo theta
-            r = np.array(
+    # Guarda as orientações filtradas dos microbits com amostra nova (máscara
+    # `new`, None para todos) nos instantes `times` e retorna as orientações
+    # de todos interpoladas por slerp para o instante mais recente já coberto
+    # por todos
+    def _aligned_rotations(self, times, new):
+        quaternions = self.orientation_filter.quaternion
+        for device, history in enumerate(self.orientation_histories):
+            if new is None or new[device]:
+                history.append(times[device], quaternions[device])
+        timestamp = min(history.last()[0] for history in self.orientation_histories)
+        self.frame_timestamps = np.full(len(self.microbits), timestamp)
+        self.time_spread = 0.0
+        return quaternion_to_matrix(
+            np.stack(
                 [
-                    [1, 0, 0],
-                    [0, np.cos(theta), np.sin(theta)],
-                    [0, -np.sin(theta), np.cos(theta)],
+                    resample_slerp(history.times(), history.values(), [timestamp])[0]
+                    for history in self.orientation_histories
                 ]
             )
+        )
 
-            # Aplica a rotação r na projeção do vetor norte no plano yz no
-            # sistema de coordenadas do microbit do primeiro segmento do braço
-            narm_vector = np.dot(r, np.array([0, north0_yz[0], north0_yz[1]]))
+    # Atualiza os vetores para o estado atual
+    def update(self):
+        # Lê os vetores norte de todos os microbits de uma vez, formando um
+        # único quadro
+        timestamps, norths = self._read_magnetometers()
+        # No modo streaming, sem amostra nova de nenhum microbit o quadro seria
+        # igual ao anterior e não é produzido
+        if self.streams is not None and np.array_equal(timestamps, self.timestamps):
+            return
+        self.timestamps = self.frame_timestamps = timestamps
+        self.time_spread = max(self.timestamps) - min(self.timestamps)
+        math_start = perf_counter()
 
-            # Adiciona o vetor resultante à lista de vetores
-            vectors.append(narm_vector)
+        # Corrige as distorções de ferro duro e mole de cada magnetômetro
+        norths = self._calibrate_magnetometers(norths)
+        if self.noise_filter is not None:
+            norths = self.noise_filter(self.timestamps, norths)
 
-        # Atualiza a lista de vetores dessa instância do objeto JointTracker
-        self.vectors = vectors
+        # Orientações de todos os segmentos de uma vez, como matrizes de
+        # rotação empilhadas (ver kinematics.segment_rotations). O vetor de
+        # cada segmento é sua orientação aplicada a [0, -1, 0].
+        if self.orientation_filter is None:
+            self.rotations = segment_rotations(norths)
+        else:
+            # Orientação 3D de cada microbit no sistema norte-leste-baixo,
+            # filtrada amostra a amostra para todos os microbits de uma vez. Só
+            # avançam os microbits com amostra nova de algum dos dois sensores.
+            accelerometers = self._read_accelerometers()
+            fusion_times = np.stack(
+                (self.accelerometer_frame.times, self.timestamps), axis=-1
+            )
+            new = None
+            if self.fusion_times is not None:
+                new = (fusion_times != self.fusion_times).any(axis=-1)
+            self.fusion_times = fusion_times
+            self.orientation_filter.update(accelerometers, norths, new)
+            if self.orientation_histories is None:
+                self.rotations = self.orientation_filter.matrix
+            else:
+                self.rotations = self._aligned_rotations(fusion_times.max(axis=-1), new)
+        self.vectors = self.rotations @ BASE_VECTOR
+        self._update_changed()
+        self._angles = None
+        angles = self._joint_angles()
+        self.history.append(np.mean(self.frame_timestamps), angles[1])
 
-        # Printa os angulos no terminal
-        system("cls")
-        print([np.degrees(x) for x in self.angles_refn])
+        # Mostra os ângulos, no máximo na taxa permitida pelo destino
+        if self.status.due():
+            self.status.emit(
+                {
+                    "frame": self.produced,
+                    "angles": np.degrees(angles[1]),
+                    "spread_ms": self.time_spread * 1000,
+                }
+            )
 
-        # Daqui pra baixo é apenas um sonho distante
-        rot_vectors = []
-        north0_xy = np.array([north0[0], north0[1]])
-        phi = get_angle(north0_xy, np.array([0, -1]))
-        rphi = np.array(
-            [[np.cos(phi), -np.sin(phi), 0], [np.sin(phi), np.cos(phi), 0], [0, 0, 1]]
-        )
-        north0_yz = np.array([north0[1], north0[2]])
-        gama = get_angle(north0_yz, np.array([0, -1]))
-        rgama = np.array(
-            [
-                [1, 0, 0],
-                [0, np.cos(gama), -np.sin(gama)],
-                [0, np.sin(gama), np.cos(gama)],
-            ]
-        )
-        for vector in vectors:
-            rot_vectors.append(np.dot(rgama, np.dot(rphi, vector)))
-        self.vectors = rot_vectors
+        self.instrumentation.record("math", perf_counter() - math_start)
+        self.instrumentation.record("spread", self.time_spread)
+        self.instrumentation.tick("frames")
+
+        self._publish()
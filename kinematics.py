@@ -0,0 +1,110 @@
+import numpy as np
+
+# Vetor de cada segmento no seu próprio sistema de coordenadas
+BASE_VECTOR = np.array([0.0, -1.0, 0.0])
+
+
+# Ângulo no sentido antihorário de v1 para v2, para qualquer número de pares de
+# vetores bidimensionais (arrays (..., 2)), no intervalo [0, 2π). Usa atan2 do
+# produto vetorial e do produto escalar, que é estável perto de 0 e 180 graus,
+# onde o arcosseno perde precisão.
+def angle_between(v1, v2):
+    v1 = np.asarray(v1, dtype=float)
+    v2 = np.asarray(v2, dtype=float)
+    cross = v1[..., 0] * v2[..., 1] - v1[..., 1] * v2[..., 0]
+    dot = v1[..., 0] * v2[..., 0] + v1[..., 1] * v2[..., 1]
+    return np.mod(np.arctan2(cross, dot), 2 * np.pi)
+
+
+def normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+# Matrizes de rotação empilhadas em torno do eixo x (ou z) a partir de arrays
+# de cossenos e senos
+def rotation_x(cos, sin):
+    r = np.zeros(np.shape(cos) + (3, 3))
+    r[..., 0, 0] = 1
+    r[..., 1, 1] = cos
+    r[..., 1, 2] = -sin
+    r[..., 2, 1] = sin
+    r[..., 2, 2] = cos
+    return r
+
+
+def rotation_z(cos, sin):
+    r = np.zeros(np.shape(cos) + (3, 3))
+    r[..., 0, 0] = cos
+    r[..., 0, 1] = -sin
+    r[..., 1, 0] = sin
+    r[..., 1, 1] = cos
+    r[..., 2, 2] = 1
+    return r
+
+
+# Orientação (..., N, 3, 3) de cada segmento a partir dos vetores norte
+# (..., N, 3) dos N microbits, tal que o vetor do segmento é R @ BASE_VECTOR.
+# Funciona para um quadro (N, 3) ou para T quadros (T, N, 3) de uma vez.
+def segment_rotations(magnetometer):
+    magnetometer = np.asarray(magnetometer, dtype=float)
+
+    # Projeção normalizada do vetor norte de cada microbit no plano yz (plano
+    # do braço)
+    north_yz = normalize(magnetometer[..., 1:])
+
+    # O ângulo theta entre -y e o norte de cada segmento tem cosseno -y e seno
+    # -z. A rotação em torno de x no sentido horário por theta leva a projeção
+    # do norte do braço para o sistema do segmento.
+    theta = rotation_x(-north_yz[..., 0], north_yz[..., 1])
+
+    # Rotação que leva [0, -1, 0] para a projeção do norte do braço
+    north0 = rotation_x(-north_yz[..., :1, 0], -north_yz[..., :1, 1])
+    local = theta @ north0
+
+    # O primeiro segmento fica em [0, -1, 0]
+    local[..., 0, :, :] = np.eye(3)
+
+    # Rotação final por phi em torno de z e por gama em torno de x, a partir
+    # do norte do braço
+    north0_xy = normalize(magnetometer[..., 0, :2])
+    north0_yz = north_yz[..., 0, :]
+    rphi = rotation_z(-north0_xy[..., 1], -north0_xy[..., 0])
+    rgama = rotation_x(-north0_yz[..., 1], -north0_yz[..., 0])
+    return (rgama @ rphi)[..., None, :, :] @ local
+
+
+# Ângulo, em torno do eixo x e no intervalo [0, 2π), da rotação relativa que
+# leva a orientação `a` para a orientação `b`. Para dois segmentos com vetores
+# va e vb no plano yz, é o ângulo no sentido antihorário de va para vb.
+def relative_angles(a, b):
+    relative = np.swapaxes(a, -1, -2) @ b
+    return np.mod(np.arctan2(relative[..., 2, 1], relative[..., 1, 1]), 2 * np.pi)
+
+
+# Cadeia de N segmentos ligados ponta a ponta a partir da origem. Guarda as
+# orientações empilhadas (..., N, 3, 3) e calcula vetores, posições das juntas
+# e ângulos de todos os segmentos de uma vez, para um ou vários quadros.
+class KinematicChain:
+    def __init__(self, lengths):
+        self.lengths = np.asarray(lengths, dtype=float)
+        self.rotations = np.tile(np.eye(3), (len(self.lengths), 1, 1))
+
+    def set_rotations(self, rotations):
+        self.rotations = np.asarray(rotations, dtype=float)
+
+    @property
+    def vectors(self):
+        return self.rotations @ BASE_VECTOR
+
+    # Posições (..., N + 1, 3) da origem e da ponta de cada segmento
+    @property
+    def positions(self):
+        offsets = self.vectors * self.lengths[:, None]
+        positions = np.zeros(offsets.shape[:-2] + (len(self.lengths) + 1, 3))
+        np.cumsum(offsets, axis=-2, out=positions[..., 1:, :])
+        return positions
+
+    # Ângulo de cada segmento em relação ao anterior, (..., N - 1)
+    @property
+    def angles(self):
+        return relative_angles(self.rotations[..., 1:, :, :], self.rotations[..., :-1, :, :])
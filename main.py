@@ -1,8 +1,332 @@
-from joint_tracker import JointTracker
-from animate_joint import JointAnimation
+import argparse
+import math
+from time import sleep, time
 
-if __name__ == '__main__':
-    joint_tracker = JointTracker('C3:B0:42:88:FE:07', 'F6:8C:51:58:97:63')
+# Os módulos do projeto e as bibliotecas pesadas (matplotlib, pandas e a pilha
+# BLE do kaspersmicrobit) são importados dentro de cada subcomando, só quando
+# o modo escolhido precisa deles.
+
+
+# Microbits dados na linha de comando: endereços Bluetooth ou
+# "simulated:<nome>" para um microbit simulado, sem hardware
+def open_microbits(addresses):
+    microbits = []
+    for index, address in enumerate(addresses):
+        if address.startswith("simulated:"):
+            from simulation import SimulatedMicrobit
+
+            microbits.append(
+                SimulatedMicrobit(address.removeprefix("simulated:"), seed=index)
+            )
+        else:
+            microbits.append(address)
+    return microbits
+
+
+def create_tracker(args, microbits):
+    from joint_tracker import JointTracker
+    from status import TerminalStatus
+
+    noise_filter = None
+    if args.filter is not None:
+        from filters import FILTERS
+
+        noise_filter = FILTERS[args.filter]()
+    publisher = None
+    if args.publish is not None:
+        from publisher import JointPublisher
+
+        publisher = JointPublisher(port=args.publish)
+    tracker = JointTracker(
+        *microbits,
+        concurrent=args.mode == "concurrent",
+        streaming=args.mode == "streaming",
+        aligned=args.aligned,
+        fusion_gain=args.fusion_gain,
+        noise_filter=noise_filter,
+        dead_band=None if args.dead_band is None else math.radians(args.dead_band),
+        status=TerminalStatus(args.status_rate) if args.status_rate else None,
+        publisher=publisher,
+    )
+    if args.calibration is not None:
+        from calibration import CalibrationCache
+
+        tracker.load_magnetometer_calibrations(
+            CalibrationCache(args.calibration, validity=None)
+        )
+    return tracker
+
+
+# Tracker de microbits ao vivo. Com --startup-cache, mede antes o ângulo entre
+# gravidade e norte (JointTracker.startup), reaproveitando o valor do cache
+# enquanto ele for válido.
+def open_tracker(args):
+    tracker = create_tracker(args, open_microbits(args.addresses))
+    if args.startup_cache is not None:
+        from calibration import CalibrationCache
+
+        tracker.startup(CalibrationCache(args.startup_cache))
+    return tracker
+
+
+def close_tracker(tracker, args):
+    tracker.close()
+    if tracker.publisher is not None:
+        tracker.publisher.close()
+    if args.stats is not None:
+        tracker.instrumentation.export(args.stats)
+
+
+# Janela com a animação da cadeia, até fechar a janela ou acabarem os quadros
+def view(tracker, args):
+    from animate_joint import JointAnimation
+
+    lengths = args.lengths or [1] * len(tracker.microbits)
     joint_animation = JointAnimation(
-        joint_tracker, [1, 1], frames=5000, xyz_lim=[[-2, 2]] * 3)
-    joint_animation.animate()
+        tracker, lengths, frames=args.frames, xyz_lim=[[-sum(lengths), sum(lengths)]] * 3
+    )
+    tracker.start()
+    try:
+        joint_animation.animate()
+    finally:
+        close_tracker(tracker, args)
+
+
+# Aquisição sem janela, por `duration` segundos ou até Ctrl+C
+def track(tracker, args):
+    tracker.start()
+    start = time()
+    try:
+        while tracker.running and (args.duration is None or time() - start < args.duration):
+            sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        close_tracker(tracker, args)
+    print()
+    print(f"{tracker.produced} frames in {time() - start:.1f} s")
+
+
+def command_live(args):
+    view(open_tracker(args), args)
+
+
+def command_track(args):
+    track(open_tracker(args), args)
+
+
+def command_replay(args):
+    from recording import load_session
+    from replay import ReplayMicrobit
+
+    devices = len(load_session(args.directory))
+    speed = None if args.speed == 0 else args.speed
+    microbits = [
+        ReplayMicrobit(args.directory, device, speed=speed, loop=args.loop)
+        for device in range(devices)
+    ]
+    tracker = create_tracker(args, microbits)
+    if args.view:
+        view(tracker, args)
+    else:
+        track(tracker, args)
+
+
+def command_record(args):
+    from joint_tracker import JointTracker
+    from recording import Characteristic, export_excel, record_microbits
+
+    try:
+        characteristics = [Characteristic[name.upper()] for name in args.characteristics]
+    except KeyError as error:
+        raise SystemExit(f"Unknown characteristic {error}.")
+    # record_microbits recebe microbits já conectados
+    microbits = JointTracker.get_connection(open_microbits(args.addresses))
+    try:
+        record_microbits(
+            *microbits,
+            characteristics=characteristics,
+            time_length=args.time,
+            verbose=True,
+            directory=args.directory,
+            streaming=args.streaming,
+        )
+    finally:
+        for microbit in microbits:
+            microbit.disconnect()
+    print()
+    if args.excel:
+        export_excel(args.directory)
+
+
+def command_offline(args):
+    from offline import process_session
+
+    calibrations = None
+    if args.calibration is not None:
+        from calibration import CalibrationCache
+        from recording import session_addresses
+
+        cache = CalibrationCache(args.calibration, validity=None)
+        calibrations = [
+            cache.get_magnetometer(address)
+            for address in session_addresses(args.directory)
+        ]
+    vectors, _ = process_session(
+        args.directory, args.out_directory, calibrations=calibrations, rate=args.rate
+    )
+    print(f"{len(vectors)} frames written to {args.out_directory}")
+
+
+def command_calibrate(args):
+    from calibration import CalibrationCache, calibrate_session
+    from recording import session_addresses
+
+    cache = CalibrationCache(args.calibration, validity=None)
+    try:
+        calibrate_session(args.directory, cache)
+    except ValueError as error:
+        raise SystemExit(f"Calibration failed: {error}")
+    for address in session_addresses(args.directory):
+        print(f"{address}: magnetometer calibration written to {args.calibration}")
+
+
+def command_export(args):
+    from export_video import export_video
+
+    frames = export_video(
+        args.directory,
+        args.file_name,
+        kind=args.kind,
+        fps=args.fps,
+        workers=args.workers,
+        lengths=args.lengths,
+    )
+    print(f"{frames} frames written to {args.file_name}")
+
+
+def command_cloud(args):
+    from point_cloud import PointCloudViewer, recording_pyramid
+
+    pyramid = recording_pyramid(
+        args.source,
+        args.channel,
+        device=args.device,
+        raw=args.raw,
+        lengths=args.lengths,
+        depth=args.depth,
+    )
+    PointCloudViewer(pyramid, args.max_points, title=args.channel).show()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Track joints with micro:bits.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tracking = argparse.ArgumentParser(add_help=False)
+    tracking.add_argument(
+        "--mode", choices=("sequential", "concurrent", "streaming"), default="concurrent"
+    )
+    tracking.add_argument(
+        "--aligned", action="store_true", help="interpolate streams to a common instant"
+    )
+    tracking.add_argument("--fusion-gain", type=float, default=None)
+    tracking.add_argument(
+        "--filter", choices=("ema", "one-euro", "median"), help="magnetometer noise filter"
+    )
+    tracking.add_argument(
+        "--dead-band",
+        type=float,
+        metavar="DEGREES",
+        help="only redraw when a segment moves more than DEGREES",
+    )
+    tracking.add_argument("--calibration", help="calibration cache file")
+    tracking.add_argument("--publish", type=int, metavar="PORT", help="serve frames on PORT")
+    tracking.add_argument(
+        "--status-rate", type=float, default=4.0, help="status lines per second (0: none)"
+    )
+    tracking.add_argument("--stats", help="write timing statistics to this JSON file")
+    tracking.add_argument("--lengths", type=float, nargs="+", default=None)
+    tracking.add_argument("--frames", type=int, default=None, help="frames to show")
+    tracking.add_argument("--duration", type=float, default=None, help="seconds to track")
+    addresses = argparse.ArgumentParser(add_help=False)
+    addresses.add_argument(
+        "addresses", nargs="+", help='Bluetooth addresses, or "simulated:<name>"'
+    )
+
+    live = commands.add_parser(
+        "live", parents=[addresses, tracking], help="3D view of live micro:bits"
+    )
+    live.set_defaults(handler=command_live)
+    headless = commands.add_parser(
+        "track", parents=[addresses, tracking], help="track live micro:bits without a window"
+    )
+    headless.set_defaults(handler=command_track)
+    for command in (live, headless):
+        command.add_argument(
+            "--startup-cache",
+            metavar="FILE",
+            help="measure the gravity-north angle at startup, cached in FILE",
+        )
+
+    replay = commands.add_parser(
+        "replay", parents=[tracking], help="track a recorded session as if it were live"
+    )
+    replay.add_argument("directory")
+    replay.add_argument("--speed", type=float, default=1.0, help="0: as fast as possible")
+    replay.add_argument("--loop", action="store_true")
+    replay.add_argument("--view", action="store_true", help="show the 3D view")
+    replay.set_defaults(handler=command_replay)
+
+    record = commands.add_parser("record", parents=[addresses], help="record sensor data")
+    record.add_argument("--time", type=float, required=True, help="seconds to record")
+    record.add_argument("--directory", default="session")
+    record.add_argument(
+        "--characteristics", nargs="+", default=["accelerometer", "magnetometer"]
+    )
+    record.add_argument("--streaming", action="store_true")
+    record.add_argument("--excel", action="store_true", help="also export .xlsx files")
+    record.set_defaults(handler=command_record)
+
+    offline = commands.add_parser("offline", help="compute joint vectors of a session")
+    offline.add_argument("directory")
+    offline.add_argument("out_directory")
+    offline.add_argument("--rate", type=float, default=None, help="resample to RATE Hz")
+    offline.add_argument("--calibration", help="calibration cache file")
+    offline.set_defaults(handler=command_offline)
+
+    calibrate = commands.add_parser(
+        "calibrate", help="fit the magnetometer calibrations of a recorded sweep"
+    )
+    calibrate.add_argument("directory")
+    calibrate.add_argument(
+        "--calibration", default="calibration.json", help="calibration cache file"
+    )
+    calibrate.set_defaults(handler=command_calibrate)
+
+    export = commands.add_parser("export", help="render a session to a video")
+    export.add_argument("directory")
+    export.add_argument("file_name")
+    export.add_argument("--kind", choices=("joint", "accelerometer"), default="joint")
+    export.add_argument("--fps", type=float, default=30)
+    export.add_argument("--workers", type=int, default=None)
+    export.add_argument("--lengths", type=float, nargs="+", default=None)
+    export.set_defaults(handler=command_export)
+
+    cloud = commands.add_parser("cloud", help="3D view of all samples of a recording")
+    cloud.add_argument("source", help="session directory or .xlsx/.csv table")
+    cloud.add_argument(
+        "--channel", choices=("magnetometer", "accelerometer", "joints"), default="magnetometer"
+    )
+    cloud.add_argument("--device", type=int, default=0)
+    cloud.add_argument("--raw", action="store_true", help="do not normalize the samples")
+    cloud.add_argument("--lengths", type=float, nargs="+", default=None)
+    cloud.add_argument("--depth", type=int, default=8, help="finest grid is 2^DEPTH per axis")
+    cloud.add_argument("--max-points", type=int, default=20000)
+    cloud.set_defaults(handler=command_cloud)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    args.handler(args)
@@ -0,0 +1,107 @@
+from os import makedirs, path
+from typing import List
+
+import numpy as np
+from calibration import MagnetometerCalibration
+from kinematics import BASE_VECTOR, KinematicChain, relative_angles, segment_rotations
+from recording import Characteristic, load_session, sample_times
+from resample import align, common_time_base
+
+
+# Mesma matemática de JointTracker.update aplicada a T quadros de uma vez.
+# Recebe os vetores norte (T, N, 3) dos N microbits e retorna os vetores dos
+# segmentos (T, N, 3), já na orientação final do tracker, e os ângulos entre
+# segmentos consecutivos (T, N - 1).
+def joint_vectors(magnetometer):
+    rotations = segment_rotations(magnetometer)
+    vectors = rotations @ BASE_VECTOR
+    angles = relative_angles(rotations[:, 1:], rotations[:, :-1])
+    return vectors, angles
+
+
+# Processa a gravação em blocos de `chunk_size` quadros, de modo que arrays
+# mapeados em memória maiores que a RAM possam ser usados
+def iter_joint_vectors(magnetometer, chunk_size: int = 65536):
+    for start in range(0, len(magnetometer), chunk_size):
+        yield joint_vectors(magnetometer[start : start + chunk_size])
+
+
+# Quadros (T, N, 3) formados pelas amostras de mesmo índice de cada
+# microbit, em blocos de `chunk_size`. Os microbits podem ter gravado números
+# diferentes de amostras; as que sobram no fim dos mais longos são ignoradas.
+def iter_frames(devices, chunk_size: int = 65536):
+    frames = min(len(values) for values in devices)
+    for start in range(0, frames, chunk_size):
+        stop = min(start + chunk_size, frames)
+        yield np.stack([values[start:stop] for values in devices], axis=1)
+
+
+# Posições (T, N + 1, 3) das juntas da cadeia de segmentos com comprimentos
+# `lengths`, em blocos de `chunk_size` quadros, como em iter_joint_vectors
+def iter_joint_positions(magnetometer, lengths, chunk_size: int = 65536):
+    chain = KinematicChain(lengths)
+    for start in range(0, len(magnetometer), chunk_size):
+        chain.set_rotations(segment_rotations(magnetometer[start : start + chunk_size]))
+        yield chain.positions
+
+
+# Calcula vetores e ângulos de uma sessão gravada por record_microbits e grava
+# o resultado em vectors.npy e angles.npy dentro de `out_directory`. Se
+# `calibrations` for dado, cada bloco do magnetômetro é corrigido antes. Com
+# `rate`, os magnetômetros são primeiro reamostrados por interpolação linear
+# numa base de tempo comum a `rate` Hz, de modo que cada quadro combina
+# medidas do mesmo instante; os instantes vão para times.npy. Sem `rate`, as
+# amostras de mesmo índice de cada microbit formam um quadro.
+def process_session(
+    directory: str,
+    out_directory: str,
+    chunk_size: int = 65536,
+    calibrations: List[MagnetometerCalibration | None] | None = None,
+    rate: float | None = None,
+):
+    session = load_session(directory)
+    devices = [data[Characteristic.MAGNETOMETER] for data in session]
+    calibrations = calibrations or [None] * len(devices)
+    if rate is None:
+        frames = min(len(magnetometer) for magnetometer in devices)
+        chunks = iter_frames(devices, chunk_size)
+    else:
+        times = [
+            sample_times(data, Characteristic.MAGNETOMETER)[: len(magnetometer)]
+            for data, magnetometer in zip(session, devices)
+        ]
+        frames = len(common_time_base(times, rate))
+        chunks = align(times, devices, rate, chunk_size)
+    makedirs(out_directory, exist_ok=True)
+    vectors = np.lib.format.open_memmap(
+        path.join(out_directory, "vectors.npy"),
+        mode="w+",
+        shape=(frames, len(devices), 3),
+    )
+    angles = np.lib.format.open_memmap(
+        path.join(out_directory, "angles.npy"),
+        mode="w+",
+        shape=(frames, len(devices) - 1),
+    )
+    if rate is not None:
+        times = np.lib.format.open_memmap(
+            path.join(out_directory, "times.npy"), mode="w+", shape=(frames,)
+        )
+    start = 0
+    for chunk in chunks:
+        if rate is not None:
+            chunk_times, chunk = chunk
+            times[start : start + len(chunk)] = chunk_times
+        chunk = np.stack(
+            [
+                magnetometer if calibration is None else calibration.apply(magnetometer)
+                for magnetometer, calibration in zip(np.swapaxes(chunk, 0, 1), calibrations)
+            ],
+            axis=1,
+        )
+        stop = start + len(chunk)
+        vectors[start:stop], angles[start:stop] = joint_vectors(chunk)
+        start = stop
+    vectors.flush()
+    angles.flush()
+    return vectors, angles
@@ -0,0 +1,110 @@
+import numpy as np
+from kinematics import normalize
+
+
+# Orientação medida a partir de uma amostra do acelerômetro (direção da
+# gravidade) e do magnetômetro (norte), pelo método TRIAD. Retorna as matrizes
+# (..., 3, 3) que levam do sistema do microbit para o sistema
+# norte-leste-baixo: as linhas são os eixos norte, leste e baixo escritos no
+# sistema do microbit.
+def triad(accelerometer, magnetometer):
+    down = normalize(np.asarray(accelerometer, dtype=float))
+    east = normalize(np.cross(down, np.asarray(magnetometer, dtype=float)))
+    north = np.cross(east, down)
+    return np.stack((north, east, down), axis=-2)
+
+
+# Conversões entre matrizes de rotação e quatérnios (w, x, y, z), vetorizadas
+def matrix_to_quaternion(r):
+    r = np.asarray(r, dtype=float)
+    w = np.sqrt(np.maximum(0, 1 + r[..., 0, 0] + r[..., 1, 1] + r[..., 2, 2])) / 2
+    x = np.sqrt(np.maximum(0, 1 + r[..., 0, 0] - r[..., 1, 1] - r[..., 2, 2])) / 2
+    y = np.sqrt(np.maximum(0, 1 - r[..., 0, 0] + r[..., 1, 1] - r[..., 2, 2])) / 2
+    z = np.sqrt(np.maximum(0, 1 - r[..., 0, 0] - r[..., 1, 1] + r[..., 2, 2])) / 2
+    x = np.copysign(x, r[..., 2, 1] - r[..., 1, 2])
+    y = np.copysign(y, r[..., 0, 2] - r[..., 2, 0])
+    z = np.copysign(z, r[..., 1, 0] - r[..., 0, 1])
+    return np.stack((w, x, y, z), axis=-1)
+
+
+def quaternion_to_matrix(q):
+    w, x, y, z = np.moveaxis(normalize(np.asarray(q, dtype=float)), -1, 0)
+    return np.stack(
+        (
+            np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)), -1),
+            np.stack((2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)), -1),
+            np.stack((2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)), -1),
+        ),
+        axis=-2,
+    )
+
+
+# Filtro complementar de orientação, com estado O(1): cada nova orientação
+# medida (TRIAD) entra com peso `gain` numa média exponencial de quatérnios, e a
+# saída é essa média normalizada. Como q e -q representam a mesma rotação, cada
+# medida é antes alinhada ao hemisfério da anterior. Aceita uma amostra (3,)
+# por sensor ou várias de uma vez, por exemplo (N, 3) para N microbits. Com a
+# máscara `new`, só avançam as orientações marcadas; as demais mantêm o estado,
+# de modo que ler de novo a mesma amostra não muda o filtro.
+class OrientationFilter:
+    def __init__(self, gain: float = 0.2):
+        self.gain = gain
+        self.state = None
+        self.last = None
+
+    def update(self, accelerometer, magnetometer, new=None):
+        measured = matrix_to_quaternion(triad(accelerometer, magnetometer))
+        if self.state is None:
+            self.last = self.state = measured
+            return self.quaternion
+        flip = np.sum(measured * self.last, axis=-1, keepdims=True) < 0
+        measured = np.where(flip, -measured, measured)
+        state = (1 - self.gain) * self.state + self.gain * measured
+        if new is None:
+            self.last, self.state = measured, state
+        else:
+            new = np.asarray(new)[..., None]
+            self.last = np.where(new, measured, self.last)
+            self.state = np.where(new, state, self.state)
+        return self.quaternion
+
+    @property
+    def quaternion(self):
+        return None if self.state is None else normalize(self.state)
+
+    @property
+    def matrix(self):
+        return None if self.state is None else quaternion_to_matrix(self.state)
+
+
+# Mesmo filtro aplicado de uma vez a uma gravação (T, ..., 3) de acelerômetro
+# e magnetômetro (o eixo 0 é o tempo). Retorna os quatérnios filtrados
+# (T, ..., 4), idênticos aos de OrientationFilter amostra a amostra. A média
+# exponencial é calculada em blocos por somas acumuladas, sem laço em Python
+# sobre as amostras.
+def filter_orientations(accelerometer, magnetometer, gain: float = 0.2, chunk_size: int = 256):
+    if not 0 < gain < 1:
+        raise ValueError("The gain must be between 0 and 1.")
+    measured = matrix_to_quaternion(triad(accelerometer, magnetometer))
+
+    # Alinhamento de sinal: inverte cada medida sempre que o produto com a
+    # anterior é negativo, acumulando as inversões
+    dots = np.sum(measured[1:] * measured[:-1], axis=-1)
+    flips = np.concatenate((np.ones((1,) + dots.shape[1:]), np.where(dots < 0, -1.0, 1.0)))
+    measured = measured * np.cumprod(flips, axis=0)[..., None]
+
+    # y[t] = (1 - gain) y[t - 1] + gain m[t], com y[0] = m[0]. Dentro de um
+    # bloco, y[k] = decay^(k+1) y[-1] + decay^k gain Σ_{j<=k} decay^-j m[j];
+    # os blocos são curtos o bastante para que decay^-k não estoure.
+    decay = 1 - gain
+    chunk_size = max(1, min(chunk_size, int(230 / -np.log(decay))))
+    filtered = np.empty_like(measured)
+    state = measured[0] if len(measured) else None
+    for start in range(0, len(measured), chunk_size):
+        block = measured[start : start + chunk_size]
+        k = np.arange(len(block)).reshape((-1,) + (1,) * (block.ndim - 1))
+        powers = decay ** (k + 1.0)
+        sums = np.cumsum(block / decay**k, axis=0) * gain
+        filtered[start : start + len(block)] = powers * state + decay**k * sums
+        state = filtered[start + len(block) - 1]
+    return normalize(filtered)
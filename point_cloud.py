@@ -0,0 +1,280 @@
+import json
+from os import makedirs, path
+
+import numpy as np
+from offline import iter_frames, iter_joint_positions
+from recording import Characteristic, load_session
+from session_loader import cache_directory, load_recording, source_fingerprint, unit_key
+
+# Versão do formato das pirâmides salvas; pirâmides de outra versão são refeitas
+PYRAMID_VERSION = 1
+# Canais que podem ser vistos como nuvem de pontos
+CHANNELS = ("magnetometer", "accelerometer", "joints")
+
+
+# Agrupa chaves de voxel repetidas, somando as somas das posições e as contagens
+def _reduce(keys, sums, counts):
+    keys, inverse = np.unique(keys, return_inverse=True)
+    sums = np.stack(
+        [np.bincount(inverse, sums[:, axis], minlength=len(keys)) for axis in range(3)],
+        axis=1,
+    )
+    return keys, sums, np.bincount(inverse, counts, minlength=len(keys)).astype(np.int64)
+
+
+# Pirâmide de decimação de uma nuvem de pontos 3D. O cubo que envolve a nuvem é
+# dividido em 2^d voxels por eixo no nível d (d = 0, ..., depth), e cada voxel
+# ocupado vira um único ponto, o centroide das amostras que caem nele, com a
+# contagem dessas amostras. O nível 0 tem um ponto e o nível `depth` tem no
+# máximo um ponto por voxel da grade mais fina, qualquer que seja o número de
+# amostras. A pirâmide é construída uma vez, em blocos, e depois qualquer
+# região pode ser mostrada com um número limitado de pontos (ver query).
+class PointPyramid:
+    def __init__(self, lower, size: float, levels):
+        self.lower = np.asarray(lower, dtype=float)
+        self.size = float(size)
+        # Lista de (centroides (M, 3) float32, contagens (M,) int64), do nível
+        # mais grosso ao mais fino
+        self.levels = levels
+
+    @property
+    def depth(self):
+        return len(self.levels) - 1
+
+    @property
+    def total(self):
+        return int(self.levels[0][1].sum())
+
+    # Constrói a pirâmide a partir de um iterável de blocos (M, 3) de pontos,
+    # dentro dos limites `lower` e `upper` (pontos fora deles vão para os voxels
+    # da borda). Pontos com NaN são ignorados.
+    @classmethod
+    def build(cls, chunks, lower, upper, depth: int = 8):
+        lower = np.asarray(lower, dtype=float)
+        upper = np.asarray(upper, dtype=float)
+        # Cubo centrado na caixa dada, para que os voxels sejam cúbicos
+        size = float((upper - lower).max()) or 1.0
+        lower = (lower + upper) / 2 - size / 2
+        grid = 1 << depth
+        keys = np.zeros(0, dtype=np.int64)
+        sums = np.zeros((0, 3))
+        counts = np.zeros(0, dtype=np.int64)
+        for chunk in chunks:
+            chunk = np.asarray(chunk, dtype=float).reshape(-1, 3)
+            chunk = chunk[~np.isnan(chunk).any(axis=1)]
+            if not len(chunk):
+                continue
+            ijk = np.clip(((chunk - lower) / size * grid).astype(np.int64), 0, grid - 1)
+            chunk_keys = (ijk[:, 0] * grid + ijk[:, 1]) * grid + ijk[:, 2]
+            keys, sums, counts = _reduce(
+                np.concatenate([keys, chunk_keys]),
+                np.concatenate([sums, chunk]),
+                np.concatenate([counts, np.ones(len(chunk), dtype=np.int64)]),
+            )
+        ijk = np.stack([keys // (grid * grid), keys // grid % grid, keys % grid], axis=1)
+        levels = []
+        for level in range(depth + 1):
+            shift = depth - level
+            coarse = ijk >> shift
+            level_grid = 1 << level
+            level_keys = (coarse[:, 0] * level_grid + coarse[:, 1]) * level_grid + coarse[:, 2]
+            _, level_sums, level_counts = _reduce(level_keys, sums, counts)
+            centroids = level_sums / np.maximum(level_counts, 1)[:, None]
+            levels.append((centroids.astype(np.float32), level_counts))
+        return cls(lower, size, levels)
+
+    # Nível mais fino cujos pontos dentro da caixa [lower, upper] não passam de
+    # `max_points`, e esses pontos (centroides e contagens). Sem caixa, usa a
+    # nuvem inteira. Os níveis são percorridos do mais grosso ao mais fino,
+    # então o custo não depende do tamanho do nível mais fino quando a caixa
+    # é grande.
+    def query(self, max_points: int, lower=None, upper=None):
+        chosen = 0, *self.levels[0]
+        for level, (centroids, counts) in enumerate(self.levels):
+            if lower is not None:
+                inside = np.all((centroids >= lower) & (centroids <= upper), axis=1)
+                centroids, counts = centroids[inside], counts[inside]
+            if len(centroids) > max_points:
+                break
+            chosen = level, centroids, counts
+        return chosen
+
+    def save(self, file_name: str, fingerprint: dict | None = None):
+        arrays = {}
+        for level, (centroids, counts) in enumerate(self.levels):
+            arrays[f"centroids_{level}"] = centroids
+            arrays[f"counts_{level}"] = counts
+        meta = {"version": PYRAMID_VERSION, "fingerprint": fingerprint}
+        with open(file_name, "wb") as file:
+            np.savez(
+                file,
+                lower=self.lower,
+                size=self.size,
+                meta=np.array(json.dumps(meta)),
+                **arrays,
+            )
+
+    # Carrega uma pirâmide salva, ou retorna None se ela não existe ou foi
+    # salva para outra versão da origem (`fingerprint`)
+    @classmethod
+    def load(cls, file_name: str, fingerprint: dict | None = None):
+        if not path.exists(file_name):
+            return None
+        with np.load(file_name) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta["version"] != PYRAMID_VERSION or meta["fingerprint"] != fingerprint:
+                return None
+            depth = sum(name.startswith("centroids_") for name in data.files) - 1
+            levels = [
+                (data[f"centroids_{level}"], data[f"counts_{level}"])
+                for level in range(depth + 1)
+            ]
+            return cls(data["lower"], float(data["size"]), levels)
+
+
+def _chunks(points, chunk_size: int):
+    for start in range(0, len(points), chunk_size):
+        yield points[start : start + chunk_size]
+
+
+# Limites de um array (M, 3) de pontos, calculados em blocos
+def _bounds(points, chunk_size: int):
+    lower = np.full(3, np.inf)
+    upper = np.full(3, -np.inf)
+    for chunk in _chunks(points, chunk_size):
+        lower = np.minimum(lower, chunk.min(axis=0))
+        upper = np.maximum(upper, chunk.max(axis=0))
+    if not np.isfinite(lower).all():
+        return np.zeros(3), np.ones(3)
+    return lower, upper
+
+
+# Pontas de todos os segmentos de todos os quadros de uma sessão, com as
+# amostras de mesmo índice de cada microbit formando um quadro (como em
+# offline.process_session sem `rate`)
+def _joint_points(directory: str, lengths, chunk_size: int):
+    devices = [data[Characteristic.MAGNETOMETER] for data in load_session(directory)]
+    for chunk in iter_frames(devices, chunk_size):
+        for positions in iter_joint_positions(chunk, lengths, chunk_size):
+            yield positions[:, 1:]
+
+
+# Pirâmide de uma gravação, construída na primeira chamada e guardada no cache
+# de session_loader (pyramid_<canal>.npz), refeita quando a origem muda.
+# `channel` é "magnetometer" ou "accelerometer" (amostras do dispositivo
+# `device` de uma sessão ou tabela, normalizadas como em old/visual_test.py ou
+# brutas com `raw=True`, útil para ver o elipsoide de uma calibração) ou
+# "joints" (posições das pontas dos segmentos de uma sessão, com comprimentos
+# `lengths`, calculadas com a mesma matemática do JointTracker).
+def recording_pyramid(
+    source: str,
+    channel: str = "magnetometer",
+    device: int = 0,
+    raw: bool = False,
+    lengths=None,
+    depth: int = 8,
+    validate: str = "mtime",
+    chunk_size: int = 65536,
+):
+    if channel not in CHANNELS:
+        raise ValueError(f"Invalid channel {channel}, it should be one of {CHANNELS}.")
+    fingerprint = {**source_fingerprint(source, validate), "depth": depth}
+    if channel == "joints":
+        if not path.isdir(source):
+            raise ValueError("Joint positions need a session directory.")
+        lengths = [float(length) for length in lengths or [1] * len(load_session(source))]
+        fingerprint["lengths"] = lengths
+        directory = path.join(source, "cache_joints")
+        file_name = path.join(directory, "pyramid_JOINTS.npz")
+    else:
+        fingerprint["raw"] = raw
+        characteristic = Characteristic[channel.upper()]
+        directory = cache_directory(source, device)
+        suffix = characteristic.name if raw else unit_key(characteristic)
+        file_name = path.join(directory, f"pyramid_{suffix}.npz")
+
+    pyramid = PointPyramid.load(file_name, fingerprint)
+    if pyramid is not None:
+        return pyramid
+    if channel == "joints":
+        reach = sum(lengths)
+        pyramid = PointPyramid.build(
+            _joint_points(source, lengths, chunk_size), [-reach] * 3, [reach] * 3, depth
+        )
+    else:
+        data = load_recording(source, device, validate, chunk_size)
+        if raw:
+            points = data[characteristic]
+            lower, upper = _bounds(points, chunk_size)
+        else:
+            points = data[unit_key(characteristic)]
+            lower, upper = [-1] * 3, [1] * 3
+        pyramid = PointPyramid.build(_chunks(points, chunk_size), lower, upper, depth)
+    makedirs(directory, exist_ok=True)
+    pyramid.save(file_name, fingerprint)
+    return pyramid
+
+
+# Janela 3D com a nuvem de uma pirâmide. Mostra no máximo `max_points` pontos,
+# coloridos pelo logaritmo da contagem; ao aproximar (botão direito arrastando
+# ou roda do mouse), os pontos dentro dos novos limites são trocados pelos de
+# um nível mais fino da pirâmide.
+class PointCloudViewer:
+    def __init__(self, pyramid: PointPyramid, max_points: int = 20000, title: str = ""):
+        import matplotlib.pyplot as plt
+
+        self.pyramid = pyramid
+        self.max_points = max_points
+        self.title = title
+        self.fig = plt.figure()
+        self.ax = self.fig.add_subplot(111, projection="3d")
+        upper = pyramid.lower + pyramid.size
+        self.ax.set_xlim(pyramid.lower[0], upper[0])
+        self.ax.set_ylim(pyramid.lower[1], upper[1])
+        self.ax.set_zlim(pyramid.lower[2], upper[2])
+        self.ax.set_box_aspect((1, 1, 1))
+        self.scatter = None
+        self.limits = None
+        self.refresh()
+        self.fig.canvas.mpl_connect("button_release_event", self.on_release)
+        self.fig.canvas.mpl_connect("scroll_event", self.on_scroll)
+
+    def _limits(self):
+        return np.array([self.ax.get_xlim(), self.ax.get_ylim(), self.ax.get_zlim()]).T
+
+    # Troca os pontos mostrados pelos do nível adequado aos limites atuais
+    def refresh(self):
+        limits = self._limits()
+        if self.limits is not None and np.array_equal(limits, self.limits):
+            return
+        self.limits = limits
+        level, centroids, counts = self.pyramid.query(self.max_points, *limits)
+        if self.scatter is not None:
+            self.scatter.remove()
+        self.scatter = self.ax.scatter(
+            *centroids.T, c=np.log1p(counts), s=2, depthshade=False
+        )
+        self.ax.set_title(
+            f"{self.title} level {level}/{self.pyramid.depth}: "
+            f"{len(centroids)} points, {int(counts.sum())} of {self.pyramid.total} samples"
+        )
+        self.fig.canvas.draw_idle()
+
+    def on_release(self, event):
+        self.refresh()
+
+    # Aproxima ou afasta em torno do centro dos limites atuais
+    def on_scroll(self, event):
+        scale = 0.8 if event.button == "up" else 1.25
+        limits = self._limits()
+        center = limits.mean(axis=0)
+        limits = center + (limits - center) * scale
+        self.ax.set_xlim(limits[:, 0])
+        self.ax.set_ylim(limits[:, 1])
+        self.ax.set_zlim(limits[:, 2])
+        self.refresh()
+
+    def show(self):
+        import matplotlib.pyplot as plt
+
+        plt.show()
@@ -0,0 +1,252 @@
+import socket
+import struct
+from collections import deque
+from threading import Condition, Event, Lock, Thread
+
+import numpy as np
+from instrumentation import Instrumentation
+from joint_tracker import JointSnapshot
+from kinematics import BASE_VECTOR
+
+# Cada quadro é um cabeçalho fixo seguido de arrays little-endian cujo tamanho
+# depende só do número N de microbits: instantes das leituras (N float64),
+# orientações (N x 3 x 3 float32) e ângulos entre segmentos (N - 1 float32).
+# Os vetores dos segmentos são recalculados no assinante a partir das
+# orientações. O cabeçalho leva a revisão do quadro (ver JointTracker.dead_band)
+# desde a versão 2.
+MAGIC = b"MBJS"
+VERSION = 2
+HEADER = struct.Struct("<4sBBIId")
+DEFAULT_PORT = 5757
+
+
+def encode_snapshot(snapshot: JointSnapshot):
+    devices = len(snapshot.rotations)
+    return b"".join(
+        (
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                devices,
+                snapshot.frame,
+                snapshot.revision,
+                snapshot.timestamp,
+            ),
+            np.asarray(snapshot.timestamps, dtype="<f8").tobytes(),
+            np.asarray(snapshot.rotations, dtype="<f4").tobytes(),
+            np.asarray(snapshot.angles, dtype="<f4").tobytes(),
+        )
+    )
+
+
+def payload_size(devices: int):
+    return devices * 8 + devices * 9 * 4 + (devices - 1) * 4
+
+
+def decode_snapshot(header: bytes, payload: bytes):
+    magic, version, devices, frame, revision, timestamp = HEADER.unpack(header)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a joint snapshot frame of a supported version.")
+    timestamps = np.frombuffer(payload, dtype="<f8", count=devices)
+    offset = devices * 8
+    rotations = np.frombuffer(
+        payload, dtype="<f4", count=devices * 9, offset=offset
+    ).reshape(devices, 3, 3)
+    offset += devices * 9 * 4
+    angles = np.frombuffer(payload, dtype="<f4", count=devices - 1, offset=offset)
+    rotations = rotations.astype(float)
+    return JointSnapshot(
+        frame,
+        timestamp,
+        timestamps,
+        rotations,
+        rotations @ BASE_VECTOR,
+        angles.astype(float),
+        revision,
+    )
+
+
+# Conexão de um assinante. Os quadros esperam numa fila curta; se o assinante
+# não acompanha, os mais velhos são descartados, de modo que o produtor nunca
+# espera por um consumidor lento e cada assinante recebe sempre o estado mais
+# recente.
+class Subscription:
+    def __init__(self, connection: socket.socket, address, queue_length: int):
+        self.connection = connection
+        self.address = address
+        self.queue = deque(maxlen=queue_length)
+        self.condition = Condition()
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def push(self, message: bytes):
+        with self.condition:
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += 1
+            self.queue.append(message)
+            self.condition.notify()
+
+    def _run(self):
+        try:
+            while True:
+                with self.condition:
+                    while not self.queue and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        return
+                    message = self.queue.popleft()
+                self.connection.sendall(message)
+                self.sent += 1
+        except OSError:
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.connection.close()
+        except OSError:
+            pass
+
+
+# Servidor local que distribui cada quadro publicado pelo JointTracker a todos
+# os assinantes conectados por TCP. O quadro é codificado uma vez só,
+# qualquer que seja o número de assinantes, e a carga sobre os microbits não
+# muda com o número de consumidores.
+class JointPublisher:
+    def __init__(
+        self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, queue_length: int = 8
+    ):
+        self.queue_length = queue_length
+        # A lista de assinantes é alterada pela thread que aceita conexões e
+        # pela que publica, sempre sob esta trava
+        self.lock = Lock()
+        self.subscriptions: list[Subscription] = []
+        self.server = socket.create_server((host, port))
+        self.address = self.server.getsockname()
+        self.stop_event = Event()
+        self.thread = Thread(target=self._accept, daemon=True)
+        self.thread.start()
+
+    def _accept(self):
+        while not self.stop_event.is_set():
+            try:
+                connection, address = self.server.accept()
+            except OSError:
+                return
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self.lock:
+                # Uma conexão aceita durante close() é fechada em seguida
+                if self.stop_event.is_set():
+                    connection.close()
+                    return
+                self.subscriptions.append(
+                    Subscription(connection, address, self.queue_length)
+                )
+
+    def publish(self, snapshot: JointSnapshot):
+        message = encode_snapshot(snapshot)
+        with self.lock:
+            self.subscriptions = [
+                subscription
+                for subscription in self.subscriptions
+                if not subscription.closed
+            ]
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.push(message)
+
+    @property
+    def dropped(self):
+        with self.lock:
+            return sum(subscription.dropped for subscription in self.subscriptions)
+
+    def close(self):
+        with self.lock:
+            self.stop_event.set()
+            subscriptions, self.subscriptions = self.subscriptions, []
+        self.server.close()
+        for subscription in subscriptions:
+            subscription.close()
+
+
+# Cliente de um JointPublisher. receive() retorna o próximo quadro
+# (JointSnapshot) ou None quando o publicador fecha a conexão. Com start(),
+# uma thread lê continuamente e guarda só o quadro mais recente, e o
+# assinante pode ser usado no lugar de um JointTracker em JointAnimation.
+class JointSubscriber:
+    def __init__(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self.connection = socket.create_connection((host, port))
+        self.file = self.connection.makefile("rb")
+        self.snapshot = None
+        self.received = 0
+        self.thread = None
+        self.instrumentation = Instrumentation()
+
+    def _read_exactly(self, size: int):
+        data = self.file.read(size)
+        if data is None or len(data) < size:
+            return None
+        return data
+
+    def receive(self):
+        header = self._read_exactly(HEADER.size)
+        if header is None:
+            return None
+        devices = HEADER.unpack(header)[2]
+        payload = self._read_exactly(payload_size(devices))
+        if payload is None:
+            return None
+        self.received += 1
+        return decode_snapshot(header, payload)
+
+    def __iter__(self):
+        while (snapshot := self.receive()) is not None:
+            yield snapshot
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for snapshot in self:
+                self.snapshot = snapshot
+                self.instrumentation.tick("frames")
+        except (OSError, ValueError):
+            pass
+
+    def latest(self):
+        return self.snapshot
+
+    def update(self):
+        snapshot = self.receive()
+        if snapshot is not None:
+            self.snapshot = snapshot
+
+    def close(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.file.close()
+        self.connection.close()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,579 @@
+import json
+import time
+from enum import IntEnum
+from os import makedirs, path
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Dict, Iterable
+
+import numpy as np
+from samples import SAMPLE_DTYPE, SampleBlock, axes, device_address, dtype_to_json
+from status import NullStatus, StatusSink, TerminalStatus
+from streaming import MicrobitStream, SensorStream
+
+if TYPE_CHECKING:
+    from kaspersmicrobit import KaspersMicrobit
+
+
+class Characteristic(IntEnum):
+    """
+    The characteristics that can be recorded.
+    """
+
+    ACCELEROMETER = 0
+    BUTTONA = 1
+    BUTTONB = 2
+    TEMPERATURE = 3
+    IOPIN = 4
+    LED = 5
+    MAGNETOMETER = 6
+
+
+# dtype and number of values per sample of each characteristic on disk. The
+# width of IOPIN depends on how many pins are configured as inputs.
+# Accelerometer and magnetometer samples are SAMPLE_DTYPE records that carry
+# their own timestamp; the other characteristics get a separate time column.
+COLUMNS = {
+    Characteristic.ACCELEROMETER: (SAMPLE_DTYPE, None),
+    Characteristic.BUTTONA: (np.uint8, 1),
+    Characteristic.BUTTONB: (np.uint8, 1),
+    Characteristic.TEMPERATURE: (np.int8, 1),
+    Characteristic.IOPIN: (np.uint8, None),
+    Characteristic.LED: (np.uint8, 5),
+    Characteristic.MAGNETOMETER: (SAMPLE_DTYPE, None),
+}
+TIME = "TIME"
+
+
+class ColumnWriter:
+    """
+    Appends fixed-dtype rows to a raw binary file, one preallocated
+    SampleBlock at a time, so memory use does not grow with the length of the
+    recording.
+    Structured dtypes (see samples.SAMPLE_DTYPE) are stored one record per row,
+    with width None.
+    """
+
+    def __init__(self, file_name: str, dtype, width: int | None, chunk_size: int = 1024):
+        self.file_name = file_name
+        self.dtype = np.dtype(dtype)
+        self.width = width
+        self.chunk = SampleBlock(chunk_size, self.dtype, width)
+        self.rows = 0
+        self.file = open(file_name, "wb")
+
+    def append(self, row):
+        self.chunk.append(row)
+        self.rows += 1
+        if self.chunk.full:
+            self.flush()
+
+    def extend(self, rows):
+        """
+        Appends a block of rows with array copies instead of one row at a time.
+        """
+        while len(rows):
+            n = self.chunk.extend(rows)
+            self.rows += n
+            rows = rows[n:]
+            if self.chunk.full:
+                self.flush()
+
+    def flush(self):
+        self.chunk.view.tofile(self.file)
+        self.file.flush()
+        self.chunk.clear()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def info(self):
+        return {
+            "file": path.basename(self.file_name),
+            "dtype": dtype_to_json(self.dtype),
+            "width": self.width,
+            "rows": self.rows,
+        }
+
+
+class SessionWriter:
+    """
+    A recording session on disk: one binary file per device and column plus a
+    meta.json describing their layout.
+    """
+
+    def __init__(self, directory: str, chunk_size: int = 1024):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.devices: list[Dict[str, ColumnWriter]] = []
+        self.addresses: list[str] = []
+        makedirs(directory, exist_ok=True)
+
+    def add_device(self, address: str):
+        self.devices.append({})
+        self.addresses.append(address)
+        return len(self.devices) - 1
+
+    def column(self, device: int, name: str, dtype, width: int):
+        file_name = path.join(self.directory, f"microbit_{device}_{name}.bin")
+        writer = ColumnWriter(file_name, dtype, width, self.chunk_size)
+        self.devices[device][name] = writer
+        return writer
+
+    def close(self):
+        for columns in self.devices:
+            for writer in columns.values():
+                writer.close()
+        meta = {
+            "devices": [
+                {
+                    "address": address,
+                    "columns": {name: writer.info() for name, writer in columns.items()},
+                }
+                for address, columns in zip(self.addresses, self.devices)
+            ]
+        }
+        with open(path.join(self.directory, "meta.json"), "w") as file:
+            json.dump(meta, file, indent=2)
+
+
+def time_key(characteristic: Characteristic):
+    """
+    Key of the per-sample timestamps of a characteristic in a session dict.
+    """
+    return f"{characteristic.name}_{TIME}"
+
+
+def samples_key(characteristic: Characteristic):
+    """
+    Key of the SAMPLE_DTYPE records of a characteristic in a session dict.
+    """
+    return f"{characteristic.name}_SAMPLES"
+
+
+def sample_times(data: dict, characteristic: Characteristic):
+    """
+    Timestamps of the samples of a characteristic. Sessions recorded before
+    per-sample timestamps only have the shared "TIME" column.
+    """
+    return data.get(time_key(characteristic), data.get(TIME))
+
+
+def load_session(directory: str):
+    """
+    Memory-maps every column of a session written by SessionWriter. Returns
+    one dict per device keyed by Characteristic, with the timestamps of each
+    characteristic under time_key(characteristic). For SAMPLE_DTYPE columns
+    the values and timestamps are views of the records, which are also
+    available under samples_key(characteristic).
+    """
+    with open(path.join(directory, "meta.json")) as file:
+        meta = json.load(file)
+    sessions = []
+    for device in meta["devices"]:
+        data = {}
+        for name, info in device["columns"].items():
+            dtype = np.dtype(info["dtype"])
+            width = info["width"]
+            shape = (info["rows"],) if width is None else (info["rows"], width)
+            if info["rows"] == 0:
+                column = np.zeros(shape, dtype=dtype)
+            else:
+                column = np.memmap(
+                    path.join(directory, info["file"]),
+                    dtype=dtype,
+                    mode="r",
+                    shape=shape,
+                )
+            if width == 1:
+                column = column[:, 0]
+            if name not in Characteristic.__members__:
+                data[name] = column
+            elif dtype.names is not None:
+                characteristic = Characteristic[name]
+                data[samples_key(characteristic)] = column
+                data[characteristic] = axes(column)
+                data[time_key(characteristic)] = column["time"]
+            else:
+                data[Characteristic[name]] = column
+        sessions.append(data)
+    return sessions
+
+
+def session_addresses(directory: str):
+    """
+    Addresses of the devices of a session, in the order of load_session.
+    """
+    with open(path.join(directory, "meta.json")) as file:
+        return [device["address"] for device in json.load(file)["devices"]]
+
+
+# Default polling rate (Hz) and priority of each characteristic. Motion
+# sensors get most of the BLE budget, slow channels are read rarely.
+DEFAULT_RATES = {
+    Characteristic.ACCELEROMETER: 50.0,
+    Characteristic.MAGNETOMETER: 50.0,
+    Characteristic.BUTTONA: 10.0,
+    Characteristic.BUTTONB: 10.0,
+    Characteristic.IOPIN: 10.0,
+    Characteristic.LED: 1.0,
+    Characteristic.TEMPERATURE: 0.5,
+}
+DEFAULT_PRIORITIES = {
+    Characteristic.ACCELEROMETER: 2,
+    Characteristic.MAGNETOMETER: 2,
+    Characteristic.BUTTONA: 1,
+    Characteristic.BUTTONB: 1,
+    Characteristic.IOPIN: 1,
+    Characteristic.LED: 0,
+    Characteristic.TEMPERATURE: 0,
+}
+
+
+class MicrobitRecorder:
+    def __init__(
+        self,
+        microbit: "KaspersMicrobit",
+        characteristics,
+        writer: SessionWriter,
+        stream: MicrobitStream | None = None,
+    ):
+        self.microbit = microbit
+        self.address = device_address(microbit)
+        self.device = writer.add_device(self.address)
+        self.writer = writer
+        # Accelerometer and magnetometer samples are drained from the
+        # notification stream instead of polled when one is given
+        self.stream = stream
+        self.start_time = time.time()
+        self.data: Dict = dict()
+        self.times: Dict = dict()
+        self.readers: Dict = dict()
+        if Characteristic.ACCELEROMETER in characteristics:
+            self.add_column(Characteristic.ACCELEROMETER)
+            self.readers[Characteristic.ACCELEROMETER] = self.actually_update_acellerometer
+        if Characteristic.BUTTONA in characteristics:
+            self.add_column(Characteristic.BUTTONA)
+            self.readers[Characteristic.BUTTONA] = self.actually_update_button_a
+        if Characteristic.BUTTONB in characteristics:
+            self.add_column(Characteristic.BUTTONB)
+            self.readers[Characteristic.BUTTONB] = self.actually_update_button_b
+        if Characteristic.TEMPERATURE in characteristics:
+            self.add_column(Characteristic.TEMPERATURE)
+            self.readers[Characteristic.TEMPERATURE] = self.actually_update_temperature
+        if Characteristic.IOPIN in characteristics:
+            num_inputs = str(self.microbit.io_pin.read_io_configuration()).count(
+                "PinIO.INPUT"
+            )
+            if num_inputs > 0:
+                self.add_column(Characteristic.IOPIN, num_inputs)
+                self.readers[Characteristic.IOPIN] = self.actually_update_io_pin
+        if Characteristic.LED in characteristics:
+            self.add_column(Characteristic.LED)
+            self.readers[Characteristic.LED] = self.actually_update_led
+        if Characteristic.MAGNETOMETER in characteristics:
+            self.add_column(Characteristic.MAGNETOMETER)
+            self.readers[Characteristic.MAGNETOMETER] = self.actually_update_magnetometer
+
+    def add_column(self, characteristic: Characteristic, width: int | None = None):
+        dtype, default_width = COLUMNS[characteristic]
+        self.data[characteristic] = self.writer.column(
+            self.device, characteristic.name, dtype, width or default_width
+        )
+        # SAMPLE_DTYPE records already hold their timestamp
+        if dtype is not SAMPLE_DTYPE:
+            self.times[characteristic] = self.writer.column(
+                self.device, time_key(characteristic), np.float64, 1
+            )
+
+    def update(self):
+        for read in self.readers.values():
+            read()
+
+    def read(self, characteristic: Characteristic):
+        self.readers[characteristic]()
+
+    def append(self, characteristic: Characteristic, start: float, value):
+        """
+        Stores one sample, timestamped at the midpoint of its BLE round trip.
+        """
+        timestamp = (start + time.time()) / 2 - self.start_time
+        if characteristic in self.times:
+            self.times[characteristic].append(timestamp)
+            self.data[characteristic].append(value)
+        else:
+            x, y, z = value
+            self.data[characteristic].append((timestamp, x, y, z, self.device))
+
+    def drain(self, characteristic: Characteristic, sensor: SensorStream):
+        samples = sensor.drain()
+        samples["time"] -= self.start_time
+        samples["device"] = self.device
+        self.data[characteristic].extend(samples)
+
+    def actually_update_acellerometer(self):
+        if self.stream is not None:
+            self.drain(Characteristic.ACCELEROMETER, self.stream.accelerometer)
+            return
+        start = time.time()
+        acc_data = self.microbit.accelerometer.read()
+        self.append(
+            Characteristic.ACCELEROMETER, start, (acc_data.x, acc_data.y, acc_data.z)
+        )
+
+    def actually_update_button_a(self):
+        start = time.time()
+        self.append(Characteristic.BUTTONA, start, self.microbit.buttons.read_button_a())
+
+    def actually_update_button_b(self):
+        start = time.time()
+        self.append(Characteristic.BUTTONB, start, self.microbit.buttons.read_button_b())
+
+    def actually_update_temperature(self):
+        start = time.time()
+        self.append(
+            Characteristic.TEMPERATURE, start, self.microbit.temperature.read()
+        )
+
+    def actually_update_io_pin(self):
+        start = time.time()
+        self.append(
+            Characteristic.IOPIN,
+            start,
+            [pin_value.value for pin_value in self.microbit.io_pin.read_data()],
+        )
+
+    def actually_update_led(self):
+        start = time.time()
+        self.append(
+            Characteristic.LED,
+            start,
+            np.frombuffer(self.microbit.led.read().to_bytes(), dtype=np.uint8),
+        )
+
+    def actually_update_magnetometer(self):
+        if self.stream is not None:
+            self.drain(Characteristic.MAGNETOMETER, self.stream.magnetometer)
+            return
+        start = time.time()
+        mag_data = self.microbit.magnetometer.read_data()
+        self.append(
+            Characteristic.MAGNETOMETER, start, (mag_data.x, mag_data.y, mag_data.z)
+        )
+
+
+class PollingScheduler:
+    """
+    Polls every characteristic of every recorder at its own target rate.
+    Each device gets its own thread, so reads of different micro:bits overlap
+    on the radio. Within a device, among the characteristics already due the
+    one with the highest priority goes first, ties broken by how overdue they
+    are. A late read is rescheduled from the moment it happened instead of
+    bursting to catch up. A rate of 0 disables a characteristic.
+    `rates` and `priorities` override the defaults for every device;
+    `device_rates` and `device_priorities` override them again for single
+    devices, keyed by address or by recorder index.
+    """
+
+    def __init__(
+        self,
+        recorders: Iterable[MicrobitRecorder],
+        rates: Dict[Characteristic, float] | None = None,
+        priorities: Dict[Characteristic, int] | None = None,
+        device_rates: Dict[str | int, Dict[Characteristic, float]] | None = None,
+        device_priorities: Dict[str | int, Dict[Characteristic, int]] | None = None,
+    ):
+        self.recorders = list(recorders)
+        self.rates = {**DEFAULT_RATES, **(rates or {})}
+        self.priorities = {**DEFAULT_PRIORITIES, **(priorities or {})}
+        self.device_rates = device_rates or {}
+        self.device_priorities = device_priorities or {}
+        for characteristic_rates in (self.rates, *self.device_rates.values()):
+            for characteristic, rate in characteristic_rates.items():
+                if rate < 0:
+                    raise ValueError(f"Negative rate {rate} for {characteristic.name}.")
+        self.stop_event = Event()
+        self.errors: list[Exception] = []
+
+    @staticmethod
+    def _for_device(defaults: dict, overrides: dict, recorder: MicrobitRecorder):
+        return {
+            **defaults,
+            **overrides.get(recorder.device, {}),
+            **overrides.get(recorder.address, {}),
+        }
+
+    def device_settings(self, recorder: MicrobitRecorder):
+        """
+        Rates and priorities of the characteristics of one recorder.
+        """
+        return (
+            self._for_device(self.rates, self.device_rates, recorder),
+            self._for_device(self.priorities, self.device_priorities, recorder),
+        )
+
+    def run_device(self, recorder: MicrobitRecorder):
+        try:
+            self.poll(recorder)
+        except Exception as error:
+            # Stops every device and re-raises from stop()
+            self.errors.append(error)
+            self.stop_event.set()
+
+    def poll(self, recorder: MicrobitRecorder):
+        rates, priorities = self.device_settings(recorder)
+        # Next due time of each enabled characteristic, in seconds from start
+        due = {
+            characteristic: 0.0
+            for characteristic in recorder.readers
+            if rates[characteristic] > 0
+        }
+        start = time.time()
+        while due and not self.stop_event.is_set():
+            now = time.time() - start
+            ready = [characteristic for characteristic, at in due.items() if at <= now]
+            if not ready:
+                if self.stop_event.wait(min(due.values()) - now):
+                    break
+                continue
+            characteristic = min(
+                ready,
+                key=lambda characteristic: (-priorities[characteristic], due[characteristic]),
+            )
+            recorder.read(characteristic)
+            now = time.time() - start
+            due[characteristic] = max(due[characteristic] + 1 / rates[characteristic], now)
+
+    def start(self):
+        self.stop_event.clear()
+        self.threads = [
+            Thread(target=self.run_device, args=(recorder,), daemon=True)
+            for recorder in self.recorders
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    @property
+    def running(self):
+        return not self.stop_event.is_set()
+
+
+def record_microbits(
+    *microbits,
+    characteristics: Iterable[Characteristic],
+    time_length: float | int,
+    verbose: bool,
+    directory: str = "session",
+    chunk_size: int = 1024,
+    status: StatusSink | None = None,
+    rates: Dict[Characteristic, float] | None = None,
+    priorities: Dict[Characteristic, int] | None = None,
+    device_rates: Dict[str | int, Dict[Characteristic, float]] | None = None,
+    device_priorities: Dict[str | int, Dict[Characteristic, int]] | None = None,
+    streaming: bool = False,
+):
+    """
+    Record data from the microbits for a given time, streaming it to
+    `directory` as it is read. Returns the memory-mapped session.
+    Each characteristic is polled at its own rate (see DEFAULT_RATES and
+    PollingScheduler for per-device overrides); with
+    streaming, accelerometer and magnetometer come from BLE notifications and
+    their rate is how often the buffers are drained.
+    Progress goes to `status` (a throttled terminal line if verbose).
+    """
+    characteristics = set([characteristic for characteristic in characteristics])
+    writer = SessionWriter(directory, chunk_size)
+    recorders = [
+        MicrobitRecorder(
+            microbit,
+            characteristics,
+            writer,
+            MicrobitStream(
+                microbit,
+                accelerometer=Characteristic.ACCELEROMETER in characteristics,
+                magnetometer=Characteristic.MAGNETOMETER in characteristics,
+            )
+            if streaming
+            else None,
+        )
+        for microbit in microbits
+    ]
+    if status is None:
+        status = TerminalStatus() if verbose else NullStatus()
+
+    scheduler = PollingScheduler(
+        recorders, rates, priorities, device_rates, device_priorities
+    )
+    start_time = time.time()
+    for recorder in recorders:
+        recorder.start_time = start_time
+    scheduler.start()
+    try:
+        now = time.time()
+        while now - start_time < time_length and scheduler.running:
+            if status.due():
+                status.emit(
+                    {
+                        "progress": f"{(now - start_time) / time_length * 100:.1f}%",
+                        "samples": sum(
+                            column.rows
+                            for recorder in recorders
+                            for column in recorder.data.values()
+                        ),
+                    }
+                )
+            time.sleep(min(0.05, max(0.0, start_time + time_length - now)))
+            now = time.time()
+    finally:
+        # stop() re-raises the first read error; the files are closed and
+        # meta.json is written anyway, so the samples read so far are kept
+        try:
+            scheduler.stop()
+        finally:
+            writer.close()
+    return load_session(directory)
+
+
+def microbit_data_to_dataframe(microbit_data: dict):
+    """
+    Converts one device of a session to a DataFrame with the column layout of
+    old/save_table.py (MAGNETOMETER_X, ..., TIME). With more than one
+    characteristic each one keeps its own timestamp column (MAGNETOMETER_TIME,
+    ...) and shorter columns are padded with NaN.
+    """
+    import pandas as pd
+
+    characteristics = [key for key in microbit_data if isinstance(key, Characteristic)]
+    data_dict = {}
+    for characteristic in characteristics:
+        data = microbit_data[characteristic]
+        if data.ndim == 1:
+            data_dict[characteristic.name] = data
+        elif characteristic in (Characteristic.ACCELEROMETER, Characteristic.MAGNETOMETER):
+            for i, axis in enumerate("XYZ"):
+                data_dict[f"{characteristic.name}_{axis}"] = data[:, i]
+        else:
+            for i in range(data.shape[1]):
+                data_dict[f"{characteristic.name}_{i}"] = data[:, i]
+        if len(characteristics) > 1:
+            data_dict[time_key(characteristic)] = sample_times(microbit_data, characteristic)
+    if len(characteristics) == 1:
+        data_dict[TIME] = sample_times(microbit_data, characteristics[0])
+    return pd.DataFrame({name: pd.Series(column) for name, column in data_dict.items()})
+
+
+def export_excel(directory: str, file_name: str = "microbit_data_{}.xlsx"):
+    """
+    Optional post-processing step: writes one .xlsx per device of a recorded
+    session.
+    """
+    for n, data in enumerate(load_session(directory)):
+        microbit_data_to_dataframe(data).to_excel(file_name.format(n), index=False)
+
@@ -0,0 +1,148 @@
+from threading import Event, Thread
+from time import sleep, time
+
+from recording import Characteristic, load_session, sample_times
+from samples import SensorData
+
+
+# Serve as amostras de uma característica gravada, uma por leitura, no ritmo
+# definido pelo ReplayMicrobit
+class ReplaySensor:
+    def __init__(self, replay, times, values):
+        self.replay = replay
+        self.times = times
+        self.values = values
+        self.index = 0
+        self.start_time = None
+        self.stop_event = Event()
+
+    def restart(self):
+        self.index = 0
+        self.start_time = time()
+
+    @property
+    def finished(self):
+        return self.index >= len(self.times)
+
+    def _next(self):
+        # Ao fim da gravação repete a última amostra, a menos que o replay
+        # esteja em loop
+        if self.finished:
+            if not self.replay.loop:
+                x, y, z = self.values[-1]
+                return SensorData(int(x), int(y), int(z))
+            self.restart()
+        self.wait_until(self.times[self.index])
+        x, y, z = self.values[self.index]
+        self.index += 1
+        return SensorData(int(x), int(y), int(z))
+
+    # Espera até o instante em que a amostra gravada em `timestamp` deve ser
+    # servida
+    def wait_until(self, timestamp: float):
+        if self.replay.speed is None:
+            return
+        if self.start_time is None:
+            self.start_time = time()
+        delay = (timestamp - self.replay.origin) / self.replay.speed - (
+            time() - self.start_time
+        )
+        if delay > 0:
+            sleep(delay)
+
+    # Mesma interface do kaspersmicrobit
+    def read(self):
+        return self._next()
+
+    def read_data(self):
+        return self._next()
+
+    def set_period(self, period):
+        pass
+
+    def notify(self, callback):
+        def run():
+            while not self.stop_event.is_set() and (self.replay.loop or not self.finished):
+                callback(self._next())
+
+        Thread(target=run, daemon=True).start()
+
+    def notify_data(self, callback):
+        self.notify(callback)
+
+
+class ReplayLed:
+    def show(self, image):
+        pass
+
+
+# Substitui um KaspersMicrobit servindo as amostras de uma sessão gravada por
+# record_microbits. speed=1 reproduz em tempo real, speed=N em N vezes a
+# velocidade original e speed=None o mais rápido possível.
+class ReplayMicrobit:
+    def __init__(
+        self,
+        directory: str,
+        device: int = 0,
+        speed: float | None = 1.0,
+        loop: bool = False,
+    ):
+        self.directory = directory
+        self.device = device
+        self.speed = speed
+        self.loop = loop
+        data = load_session(directory)[device]
+        self.accelerometer = (
+            ReplaySensor(
+                self,
+                sample_times(data, Characteristic.ACCELEROMETER),
+                data[Characteristic.ACCELEROMETER],
+            )
+            if Characteristic.ACCELEROMETER in data
+            else None
+        )
+        self.magnetometer = (
+            ReplaySensor(
+                self,
+                sample_times(data, Characteristic.MAGNETOMETER),
+                data[Characteristic.MAGNETOMETER],
+            )
+            if Characteristic.MAGNETOMETER in data
+            else None
+        )
+        # Instante da gravação que corresponde ao início da reprodução, comum
+        # a todos os sensores
+        self.origin = min(
+            (float(sensor.times[0]) for sensor in self.sensors if len(sensor.times)),
+            default=0.0,
+        )
+        self.led = ReplayLed()
+
+    @property
+    def sensors(self):
+        return [
+            sensor
+            for sensor in (self.accelerometer, self.magnetometer)
+            if sensor is not None
+        ]
+
+    # Sem loop, se os sensores que já serviram amostras chegaram ao fim da
+    # gravação; a partir daí eles só repetem a última amostra
+    @property
+    def finished(self):
+        if self.loop:
+            return False
+        served = [sensor for sensor in self.sensors if sensor.index > 0]
+        return bool(served) and all(sensor.finished for sensor in served)
+
+    @property
+    def address(self):
+        return f"replay:{self.directory}:{self.device}"
+
+    def connect(self):
+        for sensor in self.sensors:
+            sensor.restart()
+
+    def disconnect(self):
+        for sensor in self.sensors:
+            sensor.stop_event.set()
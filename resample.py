@@ -0,0 +1,76 @@
+import numpy as np
+from kinematics import normalize
+
+
+# Índices i tais que times[i] <= t < times[i + 1] e a fração de t entre as duas
+# amostras, para todos os instantes de `new_times` de uma vez. Fora do
+# intervalo gravado, repete a primeira ou a última amostra.
+def _brackets(times, new_times):
+    times = np.asarray(times, dtype=float)
+    new_times = np.asarray(new_times, dtype=float)
+    right = np.clip(np.searchsorted(times, new_times, side="right"), 1, len(times) - 1)
+    left = right - 1
+    span = times[right] - times[left]
+    fraction = np.divide(
+        new_times - times[left], span, out=np.zeros_like(new_times), where=span > 0
+    )
+    return left, right, np.clip(fraction, 0, 1)
+
+
+# Interpolação linear de amostras (T, ...) tomadas em `times` para `new_times`
+def resample_linear(times, values, new_times):
+    values = np.asarray(values)
+    if len(values) == 1:
+        return np.repeat(values.astype(float), len(new_times), axis=0)
+    left, right, fraction = _brackets(times, new_times)
+    fraction = fraction.reshape((-1,) + (1,) * (values.ndim - 1))
+    return values[left] * (1 - fraction) + values[right] * fraction
+
+
+# Interpolação esférica (slerp) de quatérnios (T, 4) tomados em `times`
+def resample_slerp(times, quaternions, new_times):
+    quaternions = normalize(np.asarray(quaternions, dtype=float))
+    if len(quaternions) == 1:
+        return np.repeat(quaternions, len(new_times), axis=0)
+    left, right, fraction = _brackets(times, new_times)
+    q0 = quaternions[left]
+    q1 = quaternions[right]
+    # Caminho mais curto: q e -q são a mesma rotação
+    dot = np.sum(q0 * q1, axis=-1)
+    q1 = np.where(dot[:, None] < 0, -q1, q1)
+    dot = np.abs(dot)
+    angle = np.arccos(np.clip(dot, -1, 1))
+    sin = np.sin(angle)
+    # Perto de ângulo zero o slerp degenera em interpolação linear
+    small = sin < 1e-6
+    safe_sin = np.where(small, 1, sin)
+    w0 = np.where(small, 1 - fraction, np.sin((1 - fraction) * angle) / safe_sin)
+    w1 = np.where(small, fraction, np.sin(fraction * angle) / safe_sin)
+    return normalize(w0[:, None] * q0 + w1[:, None] * q1)
+
+
+# Base de tempo comum a vários fluxos: instantes a `rate` Hz dentro do
+# intervalo em que todos têm amostras
+def common_time_base(times_list, rate: float):
+    start = max(float(times[0]) for times in times_list)
+    stop = min(float(times[-1]) for times in times_list)
+    if stop < start:
+        return np.zeros(0)
+    return start + np.arange(int((stop - start) * rate) + 1) / rate
+
+
+# Alinha a mesma característica de vários dispositivos (listas de instantes e
+# de valores (T_i, ...)) em uma base de tempo comum. Retorna os instantes (T,)
+# e os valores (T, N, ...). O resultado é produzido em blocos de `chunk_size`
+# instantes, então funciona com colunas mapeadas em memória.
+def align(times_list, values_list, rate: float, chunk_size: int = 65536):
+    new_times = common_time_base(times_list, rate)
+    for start in range(0, len(new_times), chunk_size):
+        chunk = new_times[start : start + chunk_size]
+        yield chunk, np.stack(
+            [
+                resample_linear(times, values, chunk)
+                for times, values in zip(times_list, values_list)
+            ],
+            axis=1,
+        )
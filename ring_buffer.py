@@ -0,0 +1,59 @@
+import numpy as np
+
+
+# Histórico de tamanho fixo de amostras multieixo com instante. Cada amostra é
+# escrita duas vezes (nas posições i e i + capacity), de modo que as últimas
+# `capacity` amostras sempre formam uma fatia contígua do array e podem ser
+# retornadas em ordem cronológica sem cópia.
+class RingBuffer:
+    def __init__(self, capacity: int, width: int = 3, dtype=float):
+        self.capacity = capacity
+        self.width = width
+        self._times = np.zeros(2 * capacity)
+        self._values = np.zeros((2 * capacity, width), dtype=dtype)
+        self._index = 0
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: float, values):
+        i = self._index
+        self._times[i] = self._times[i + self.capacity] = timestamp
+        self._values[i] = self._values[i + self.capacity] = values
+        self._index = (i + 1) % self.capacity
+        self.count += 1
+
+    # Adiciona um bloco de amostras de uma vez (por exemplo o resultado de
+    # SensorStream.drain)
+    def extend(self, timestamps, values):
+        timestamps = np.asarray(timestamps)
+        values = np.asarray(values).reshape(-1, self.width)
+        added = len(timestamps)
+        # Só as últimas `capacity` amostras do bloco cabem no buffer
+        timestamps = timestamps[-self.capacity :]
+        values = values[-self.capacity :]
+        start = self._index + added - len(timestamps)
+        positions = (start + np.arange(len(timestamps))) % self.capacity
+        for offset in (0, self.capacity):
+            self._times[positions + offset] = timestamps
+            self._values[positions + offset] = values
+        self._index = (self._index + added) % self.capacity
+        self.count += added
+
+    def _window(self, n: int | None):
+        n = len(self) if n is None else min(n, len(self))
+        stop = self._index + self.capacity
+        return slice(stop - n, stop)
+
+    # Visões (sem cópia) das últimas n amostras em ordem cronológica. As visões
+    # são válidas até a próxima escrita no buffer.
+    def times(self, n: int | None = None):
+        return self._times[self._window(n)]
+
+    def values(self, n: int | None = None):
+        return self._values[self._window(n)]
+
+    def last(self):
+        i = (self._index - 1) % self.capacity
+        return self._times[i], self._values[i]
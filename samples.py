@@ -0,0 +1,102 @@
+from typing import NamedTuple
+
+import numpy as np
+from numpy.lib.recfunctions import structured_to_unstructured
+
+# Formato único de uma amostra de sensor vetorial (acelerômetro ou
+# magnetômetro): instante, eixos x, y, z nas unidades inteiras do microbit e
+# índice do dispositivo. Ocupa 16 bytes (o último é preenchimento), de modo que
+# o instante fica alinhado em arrays de amostras.
+SAMPLE_DTYPE = np.dtype(
+    {
+        "names": ["time", "x", "y", "z", "device"],
+        "formats": [np.float64, np.int16, np.int16, np.int16, np.uint8],
+        "offsets": [0, 8, 10, 12, 14],
+        "itemsize": 16,
+    }
+)
+
+
+# Leitura de um sensor vetorial, com os mesmos campos dos tipos de dados do
+# kaspersmicrobit, para fontes de amostras que não dependem dele (replay e
+# simulação)
+class SensorData(NamedTuple):
+    x: int
+    y: int
+    z: int
+
+
+# Endereço de um microbit como texto. No kaspersmicrobit, `address` é um
+# método; no ReplayMicrobit e no SimulatedMicrobit, uma propriedade.
+def device_address(microbit):
+    address = microbit.address
+    return address() if callable(address) else address
+
+
+# Visão (..., 3) int16, sem cópia, dos eixos de um array de amostras (ou de
+# uma única amostra)
+def axes(samples):
+    return structured_to_unstructured(np.asarray(samples)[["x", "y", "z"]])
+
+
+# Descrição de um dtype que pode ir para JSON e voltar com np.dtype(...),
+# inclusive dtypes estruturados com preenchimento
+def dtype_to_json(dtype: np.dtype):
+    if dtype.names is None:
+        return dtype.str
+    return {
+        "names": list(dtype.names),
+        "formats": [dtype.fields[name][0].str for name in dtype.names],
+        "offsets": [dtype.fields[name][1] for name in dtype.names],
+        "itemsize": dtype.itemsize,
+    }
+
+
+# Bloco pré-alocado de linhas de dtype fixo, por padrão amostras SAMPLE_DTYPE
+# (com `width`, cada linha tem `width` valores). Escrever não aloca arrays, e
+# as linhas escritas podem ser lidas como visões do bloco. É o armazenamento
+# dos quadros do JointTracker e dos blocos que o ColumnWriter grava em disco.
+class SampleBlock:
+    def __init__(self, capacity: int, dtype=SAMPLE_DTYPE, width: int | None = None):
+        shape = (capacity,) if width is None else (capacity, width)
+        self.samples = np.zeros(shape, dtype=dtype)
+        self.filled = 0
+
+    def __len__(self):
+        return self.filled
+
+    @property
+    def capacity(self):
+        return len(self.samples)
+
+    @property
+    def full(self):
+        return self.filled == len(self.samples)
+
+    # Para SAMPLE_DTYPE a linha é (instante, x, y, z, dispositivo)
+    def append(self, row):
+        self.samples[self.filled] = row
+        self.filled += 1
+
+    # Copia um array de linhas para o bloco e retorna quantas couberam
+    def extend(self, rows):
+        n = min(len(rows), len(self.samples) - self.filled)
+        self.samples[self.filled : self.filled + n] = rows[:n]
+        self.filled += n
+        return n
+
+    def clear(self):
+        self.filled = 0
+
+    # Visões das linhas escritas, válidas até a próxima escrita
+    @property
+    def view(self):
+        return self.samples[: self.filled]
+
+    @property
+    def times(self):
+        return self.view["time"]
+
+    @property
+    def axes(self):
+        return axes(self.view)
@@ -0,0 +1,206 @@
+import hashlib
+import json
+from os import makedirs, path, stat
+
+import numpy as np
+from recording import TIME, Characteristic, load_session, time_key
+
+# Versão do formato do cache; caches de outra versão são refeitos
+CACHE_VERSION = 1
+# Características vetoriais, que ganham colunas derivadas
+VECTORS = (Characteristic.ACCELEROMETER, Characteristic.MAGNETOMETER)
+
+
+def norm_key(characteristic: Characteristic):
+    return f"{characteristic.name}_NORM"
+
+
+def unit_key(characteristic: Characteristic):
+    return f"{characteristic.name}_UNIT"
+
+
+def _sha256(file_name: str):
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        while block := file.read(1 << 20):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Identifica a versão do arquivo de origem: tamanho e instante de modificação
+# (validate="mtime", barato) ou tamanho e hash do conteúdo (validate="hash",
+# sobrevive a cópias que mudam o mtime)
+def _fingerprint(file_name: str, validate: str):
+    info = stat(file_name)
+    fingerprint = {"version": CACHE_VERSION, "size": info.st_size}
+    match validate:
+        case "mtime":
+            fingerprint["mtime_ns"] = info.st_mtime_ns
+        case "hash":
+            fingerprint["sha256"] = _sha256(file_name)
+        case _:
+            raise ValueError(f"Invalid validate {validate}, it should be either mtime or hash.")
+    return fingerprint
+
+
+# Separa uma tabela no layout de old/save_table.py e export_excel
+# (MAGNETOMETER_X, ..., IOPIN_0, ..., TIME ou MAGNETOMETER_TIME, ...) em arrays
+# por característica. Linhas finais sem valor (colunas mais curtas completadas
+# com NaN pelo export) são removidas de cada coluna.
+def table_columns(table):
+    names = set(table.columns)
+    columns = {}
+
+    def add(key, values, dtype):
+        values = np.asarray(values, dtype=float)
+        valid = ~np.isnan(values.reshape(len(values), -1)).any(axis=1)
+        columns[key] = values[: np.count_nonzero(valid)].astype(dtype)
+
+    for characteristic in Characteristic:
+        name = characteristic.name
+        dtype = np.int16 if characteristic in VECTORS else np.int64
+        if f"{name}_X" in names:
+            add(characteristic, table[[f"{name}_X", f"{name}_Y", f"{name}_Z"]], dtype)
+        elif name in names:
+            add(characteristic, table[name], dtype)
+        else:
+            indexed = sorted(
+                (
+                    column
+                    for column in names
+                    if column.startswith(f"{name}_") and column[len(name) + 1 :].isdigit()
+                ),
+                key=lambda column: int(column[len(name) + 1 :]),
+            )
+            if indexed:
+                add(characteristic, table[indexed], dtype)
+        if time_key(characteristic) in names:
+            add(time_key(characteristic), table[time_key(characteristic)], np.float64)
+    if TIME in names:
+        add(TIME, table[TIME], np.float64)
+    return columns
+
+
+def _read_table(file_name: str):
+    import pandas as pd
+
+    if file_name.endswith(".csv"):
+        return pd.read_csv(file_name)
+    return pd.read_excel(file_name)
+
+
+# Norma e vetor unitário de cada amostra das características vetoriais,
+# calculados em blocos e gravados como .npy no cache
+def _write_derived(data: dict, directory: str, chunk_size: int):
+    files = {}
+    for characteristic in VECTORS:
+        if characteristic not in data:
+            continue
+        values = data[characteristic]
+        norms = np.lib.format.open_memmap(
+            path.join(directory, f"{norm_key(characteristic)}.npy"),
+            mode="w+",
+            shape=(len(values),),
+        )
+        units = np.lib.format.open_memmap(
+            path.join(directory, f"{unit_key(characteristic)}.npy"),
+            mode="w+",
+            shape=(len(values), 3),
+        )
+        for start in range(0, len(values), chunk_size):
+            chunk = np.asarray(values[start : start + chunk_size], dtype=float)
+            norm = np.linalg.norm(chunk, axis=1)
+            norms[start : start + len(chunk)] = norm
+            np.divide(
+                chunk,
+                norm[:, None],
+                out=units[start : start + len(chunk)],
+                where=norm[:, None] > 0,
+            )
+        norms.flush()
+        units.flush()
+        files[norm_key(characteristic)] = f"{norm_key(characteristic)}.npy"
+        files[unit_key(characteristic)] = f"{unit_key(characteristic)}.npy"
+    return files
+
+
+def _read_cache(directory: str, fingerprint: dict):
+    meta_file = path.join(directory, "meta.json")
+    if not path.exists(meta_file):
+        return None
+    with open(meta_file) as file:
+        meta = json.load(file)
+    if meta.get("fingerprint") != fingerprint:
+        return None
+    return {
+        Characteristic[key] if key in Characteristic.__members__ else key: np.load(
+            path.join(directory, file_name), mmap_mode="r"
+        )
+        for key, file_name in meta["columns"].items()
+    }
+
+
+def _write_cache(directory: str, fingerprint: dict, columns: dict, derived: dict):
+    makedirs(directory, exist_ok=True)
+    files = {}
+    for key, values in columns.items():
+        name = key.name if isinstance(key, Characteristic) else key
+        np.save(path.join(directory, f"{name}.npy"), values)
+        files[name] = f"{name}.npy"
+    files.update(derived)
+    # O meta.json é escrito por último: um cache incompleto nunca é válido
+    with open(path.join(directory, "meta.json"), "w") as file:
+        json.dump({"fingerprint": fingerprint, "columns": files}, file, indent=2)
+
+
+# Diretório do cache de uma origem de load_recording
+def cache_directory(source: str, device: int = 0):
+    if path.isdir(source):
+        return path.join(source, f"cache_{device}")
+    return f"{source}.cache"
+
+
+# Identificação da versão de uma origem de load_recording (ver _fingerprint)
+def source_fingerprint(source: str, validate: str = "mtime"):
+    if path.isdir(source):
+        return _fingerprint(path.join(source, "meta.json"), validate)
+    return _fingerprint(source, validate)
+
+
+# Carrega uma gravação como um dicionário no formato de load_session
+# (Characteristic -> valores, "<NOME>_TIME" ou "TIME" -> instantes), com as
+# colunas derivadas "<NOME>_NORM" e "<NOME>_UNIT" do acelerômetro e do
+# magnetômetro. `source` pode ser um diretório de sessão de record_microbits
+# (de onde se usa o dispositivo `device`) ou uma tabela .xlsx/.csv no layout de
+# export_excel. A tabela é lida uma única vez e copiada em colunas binárias
+# num cache ao lado dela (<arquivo>.cache); as colunas derivadas de uma sessão
+# ficam em <sessão>/cache_<device>. Tudo é retornado mapeado em memória, e o
+# cache é refeito quando a origem muda (ver _fingerprint).
+def load_recording(
+    source: str,
+    device: int = 0,
+    validate: str = "mtime",
+    chunk_size: int = 65536,
+):
+    directory = cache_directory(source, device)
+    fingerprint = source_fingerprint(source, validate)
+    if path.isdir(source):
+        data = load_session(source)[device]
+        derived = _read_cache(directory, fingerprint)
+        if derived is None:
+            makedirs(directory, exist_ok=True)
+            _write_cache(
+                directory, fingerprint, {}, _write_derived(data, directory, chunk_size)
+            )
+            derived = _read_cache(directory, fingerprint)
+        return {**data, **derived}
+
+    data = _read_cache(directory, fingerprint)
+    if data is None:
+        columns = table_columns(_read_table(source))
+        makedirs(directory, exist_ok=True)
+        _write_cache(
+            directory, fingerprint, columns, _write_derived(columns, directory, chunk_size)
+        )
+        data = _read_cache(directory, fingerprint)
+    return data
@@ -0,0 +1,104 @@
+from math import cos, pi, sin
+from random import Random
+from threading import Event, Thread
+from time import sleep, time
+
+from samples import SensorData
+
+
+# Sensor simulado: cada leitura demora `latency` segundos mais um ruído
+# gaussiano de desvio `jitter` (como a ida e volta BLE) e retorna um vetor que
+# gira devagar no plano yz, como um braço em movimento, com componente x
+# constante `x` e ruído de medida
+class SimulatedSensor:
+    def __init__(
+        self,
+        microbit,
+        magnitude: float,
+        phase: float,
+        seed: int,
+        x: float = 0.0,
+    ):
+        self.microbit = microbit
+        self.magnitude = magnitude
+        self.phase = phase
+        self.x = x
+        self.random = Random(seed)
+        self.period = 20
+
+    def _sample(self):
+        angle = self.phase + 2 * pi * self.microbit.frequency * time()
+        noise = self.microbit.noise
+        return SensorData(
+            int(self.x + self.random.gauss(0, noise)),
+            int(self.magnitude * cos(angle) + self.random.gauss(0, noise)),
+            int(self.magnitude * sin(angle) + self.random.gauss(0, noise)),
+        )
+
+    def _delay(self):
+        delay = self.random.gauss(self.microbit.latency, self.microbit.jitter)
+        if delay > 0:
+            sleep(delay)
+
+    # Mesma interface do kaspersmicrobit
+    def read(self):
+        self._delay()
+        return self._sample()
+
+    def read_data(self):
+        return self.read()
+
+    def set_period(self, period):
+        self.period = period
+
+    def notify(self, callback):
+        def run():
+            while not self.microbit.stop_event.wait(self.period / 1000):
+                callback(self._sample())
+
+        Thread(target=run, daemon=True).start()
+
+    def notify_data(self, callback):
+        self.notify(callback)
+
+
+class SimulatedLed:
+    def show(self, image):
+        pass
+
+
+# Substitui um KaspersMicrobit sem precisar de hardware nem de Bluetooth, para
+# medir o desempenho do resto do código. Cada microbit simulado tem uma fase
+# própria, de modo que os ângulos entre segmentos não são nulos.
+class SimulatedMicrobit:
+    def __init__(
+        self,
+        name: str = "simulated",
+        latency: float = 0.01,
+        jitter: float = 0.002,
+        noise: float = 2.0,
+        frequency: float = 0.2,
+        seed: int = 0,
+    ):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.noise = noise
+        self.frequency = frequency
+        self.stop_event = Event()
+        phase = Random(seed).uniform(0, 2 * pi)
+        # Gravidade e norte perpendiculares, para que a fusão seja bem definida
+        self.accelerometer = SimulatedSensor(self, 1024, phase + pi / 2, seed)
+        # O campo magnético tem uma componente fora do plano do braço
+        self.magnetometer = SimulatedSensor(self, 400, phase, seed + 1, x=150)
+        self.led = SimulatedLed()
+
+    @property
+    def address(self):
+        return f"simulated:{self.name}"
+
+    def connect(self):
+        self.stop_event.clear()
+
+    def disconnect(self):
+        self.stop_event.set()
@@ -0,0 +1,83 @@
+import logging
+import sys
+from abc import ABC, abstractmethod
+from time import time
+
+import numpy as np
+
+
+# Destino das mensagens de estado do tracker e do gravador. O laço de aquisição
+# só monta e envia os campos quando due() permite, no máximo `rate` vezes por
+# segundo (rate=None envia a cada amostra).
+class StatusSink(ABC):
+    def __init__(self, rate: float | None = 4.0):
+        self.period = 1 / rate if rate else 0.0
+        self.next_time = 0.0
+
+    def due(self):
+        now = time()
+        if now < self.next_time:
+            return False
+        self.next_time = now + self.period
+        return True
+
+    @abstractmethod
+    def emit(self, fields: dict):
+        pass
+
+
+# Padrão: não mostra nada e não custa nada além de uma chamada por amostra
+class NullStatus(StatusSink):
+    def due(self):
+        return False
+
+    def emit(self, fields: dict):
+        pass
+
+
+def _format(value):
+    if isinstance(value, np.ndarray):
+        return np.array2string(value, precision=1, suppress_small=True)
+    if isinstance(value, float):
+        return f"{value:.2f}"
+    return str(value)
+
+
+# Uma única linha no terminal, reescrita no lugar
+class TerminalStatus(StatusSink):
+    def __init__(self, rate: float | None = 4.0, stream=None):
+        super().__init__(rate)
+        self.stream = stream or sys.stdout
+        self.width = 0
+
+    def emit(self, fields: dict):
+        line = "  ".join(f"{name}={_format(value)}" for name, value in fields.items())
+        self.stream.write("\r" + line.ljust(self.width))
+        self.stream.flush()
+        self.width = len(line)
+
+
+# Entrega os campos a uma função qualquer
+class CallbackStatus(StatusSink):
+    def __init__(self, callback, rate: float | None = None):
+        super().__init__(rate)
+        self.callback = callback
+
+    def emit(self, fields: dict):
+        self.callback(fields)
+
+
+# Registra os campos no logging, também disponíveis em record.status
+class LogStatus(StatusSink):
+    def __init__(
+        self,
+        logger: logging.Logger | None = None,
+        level: int = logging.INFO,
+        rate: float | None = 1.0,
+    ):
+        super().__init__(rate)
+        self.logger = logger or logging.getLogger("microbit_tracker")
+        self.level = level
+
+    def emit(self, fields: dict):
+        self.logger.log(self.level, "%s", fields, extra={"status": fields})
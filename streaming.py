@@ -0,0 +1,95 @@
+from threading import Event, Lock
+from time import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+from resample import resample_linear
+from ring_buffer import RingBuffer
+from samples import SAMPLE_DTYPE, axes
+
+if TYPE_CHECKING:
+    from kaspersmicrobit import KaspersMicrobit
+
+
+# Guarda as amostras recebidas por notificação de um sensor de um microbit em
+# um RingBuffer de instantes e valores (x, y, z) int16. Se `event` for dado,
+# ele é sinalizado a cada amostra, para acordar quem espera por dados novos.
+class SensorStream:
+    def __init__(self, maxlen: int = 4096, event: Event | None = None):
+        self.history = RingBuffer(maxlen, width=3, dtype=np.int16)
+        self.lock = Lock()
+        self.drained = 0
+        self.event = event
+
+    @property
+    def received(self):
+        return self.history.count
+
+    # Chamado pela thread BLE do kaspersmicrobit a cada notificação
+    def push(self, data):
+        with self.lock:
+            self.history.append(time(), (data.x, data.y, data.z))
+        if self.event is not None:
+            self.event.set()
+
+    # Retorna a amostra mais recente sem removê-la, ou None se ainda não
+    # chegou nenhuma
+    def latest(self):
+        with self.lock:
+            if self.history.count == 0:
+                return None
+            timestamp, values = self.history.last()
+            return timestamp, values.copy()
+
+    # Valor interpolado linearmente no instante `timestamp` a partir das
+    # últimas `window` amostras e arredondado para as unidades inteiras do
+    # sensor, ou None se ainda não chegou nenhuma. Fora do intervalo dessas
+    # amostras, repete a mais próxima.
+    def at(self, timestamp: float, window: int = 8):
+        with self.lock:
+            if self.history.count == 0:
+                return None
+            return np.rint(
+                resample_linear(
+                    self.history.times(window), self.history.values(window), [timestamp]
+                )[0]
+            )
+
+    # Retorna todas as amostras recebidas desde a última chamada como um array
+    # de SAMPLE_DTYPE (o índice do dispositivo fica 0)
+    def drain(self):
+        with self.lock:
+            n = self.history.count - self.drained
+            self.drained = self.history.count
+            samples = np.zeros(min(n, len(self.history)), dtype=SAMPLE_DTYPE)
+            samples["time"] = self.history.times(n)
+            axes(samples)[:] = self.history.values(n)
+            return samples
+
+
+# Inscreve-se nas notificações de acelerômetro e magnetômetro de um microbit
+# em vez de ler os sensores a cada quadro. `event` é sinalizado a cada amostra
+# nova do magnetômetro.
+class MicrobitStream:
+    def __init__(
+        self,
+        microbit: "KaspersMicrobit",
+        accelerometer: bool = True,
+        magnetometer: bool = True,
+        period: int | None = 20,
+        maxlen: int = 4096,
+        event: Event | None = None,
+    ):
+        self.microbit = microbit
+        self.accelerometer = SensorStream(maxlen) if accelerometer else None
+        self.magnetometer = SensorStream(maxlen, event) if magnetometer else None
+        # O período (em ms) deve ser um dos valores aceitos pelo microbit:
+        # 1, 2, 5, 10, 20, 80, 160 ou 640
+        if self.accelerometer is not None:
+            if period is not None:
+                microbit.accelerometer.set_period(period)
+            microbit.accelerometer.notify(self.accelerometer.push)
+        if self.magnetometer is not None:
+            if period is not None:
+                microbit.magnetometer.set_period(period)
+            microbit.magnetometer.notify_data(self.magnetometer.push)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from calibration import (
+    CalibrationCache,
+    MagnetometerCalibration,
+    calibrate_session,
+    fit_magnetometer,
+)
+from recording import Characteristic, SessionWriter
+from samples import SAMPLE_DTYPE
+
+
+# Varredura sintética: pontos de uma esfera de raio `radius` distorcidos por
+# ferro mole (`distortion`) e deslocados por ferro duro (`offset`)
+def sweep(offset, distortion, radius=500.0, samples=400, seed=0):
+    directions = np.random.default_rng(seed).normal(0, 1, (samples, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, None]
+    return radius * directions @ np.asarray(distortion).T + offset
+
+
+def test_fit_recovers_offset_and_sphere():
+    offset = np.array([120.0, -40.0, 75.0])
+    distortion = [[1.3, 0.1, 0.0], [0.1, 0.8, 0.05], [0.0, 0.05, 1.1]]
+    samples = sweep(offset, distortion)
+    calibration = fit_magnetometer(samples)
+    np.testing.assert_allclose(calibration.offset, offset, atol=1e-6)
+    radii = np.linalg.norm(calibration.apply(samples), axis=1)
+    np.testing.assert_allclose(radii, radii.mean(), rtol=1e-9)
+
+
+def test_fit_needs_enough_samples():
+    with pytest.raises(ValueError):
+        fit_magnetometer(np.ones((8, 3)))
+
+
+def test_calibrate_session_stores_one_fit_per_address(tmp_path):
+    directory = str(tmp_path / "sweep")
+    offsets = [[100.0, 0.0, 0.0], [0.0, -60.0, 30.0]]
+    writer = SessionWriter(directory)
+    for device, offset in enumerate(offsets):
+        writer.add_device(f"AA:BB:CC:DD:EE:0{device}")
+        points = sweep(offset, np.eye(3), seed=device)
+        samples = np.zeros(len(points), dtype=SAMPLE_DTYPE)
+        samples["time"] = np.arange(len(points)) * 0.02
+        samples["x"], samples["y"], samples["z"] = np.round(points).T
+        samples["device"] = device
+        writer.column(
+            device, Characteristic.MAGNETOMETER.name, SAMPLE_DTYPE, None
+        ).extend(samples)
+    writer.close()
+
+    file_name = str(tmp_path / "calibration.json")
+    calibrate_session(directory, CalibrationCache(file_name))
+    cache = CalibrationCache(file_name, validity=None)
+    for device, offset in enumerate(offsets):
+        calibration = cache.get_magnetometer(f"AA:BB:CC:DD:EE:0{device}")
+        assert isinstance(calibration, MagnetometerCalibration)
+        np.testing.assert_allclose(calibration.offset, offset, atol=2)
@@ -0,0 +1,64 @@
+import os
+import stat
+import sys
+
+import numpy as np
+import pytest
+from export_video import export_video
+from recording import Characteristic, SessionWriter
+from samples import SAMPLE_DTYPE
+
+
+# Sessão sintética de 2 microbits com 2 s de magnetômetro e acelerômetro
+@pytest.fixture
+def session(tmp_path):
+    directory = str(tmp_path / "session")
+    writer = SessionWriter(directory)
+    rng = np.random.default_rng(0)
+    for device in range(2):
+        writer.add_device(f"simulated:{device}")
+        for characteristic in (Characteristic.MAGNETOMETER, Characteristic.ACCELEROMETER):
+            samples = np.zeros(100, dtype=SAMPLE_DTYPE)
+            samples["time"] = np.arange(100) * 0.02 + 0.001 * device
+            samples["x"] = 150
+            samples["y"] = rng.integers(-400, 400, 100)
+            samples["z"] = rng.integers(-400, 400, 100)
+            samples["device"] = device
+            writer.column(device, characteristic.name, SAMPLE_DTYPE, None).extend(samples)
+    writer.close()
+    return directory
+
+
+# Substituto do ffmpeg que copia os quadros RGBA brutos para o arquivo de saída
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import shutil, sys\n"
+        "with open(sys.argv[-1], 'wb') as out:\n"
+        "    shutil.copyfileobj(sys.stdin.buffer, out)\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+@pytest.mark.parametrize("kind", ["joint", "accelerometer"])
+def test_parallel_export_matches_serial(session, fake_ffmpeg, tmp_path, kind):
+    options = dict(kind=kind, fps=10, chunk_size=3, size=(1.6, 1.2), dpi=50, ffmpeg=fake_ffmpeg)
+    serial = str(tmp_path / "serial.raw")
+    parallel = str(tmp_path / "parallel.raw")
+    frames = export_video(session, serial, workers=1, **options)
+    assert export_video(session, parallel, workers=2, **options) == frames
+    assert frames > 0
+    assert os.path.getsize(serial) == frames * 80 * 60 * 4
+    with open(serial, "rb") as a, open(parallel, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_odd_frame_size_is_rejected(session, fake_ffmpeg, tmp_path):
+    # 1.5 x 1.2 polegadas a 50 dpi: 75 x 60 pixels, largura ímpar
+    with pytest.raises(ValueError, match="75x60"):
+        export_video(
+            session, str(tmp_path / "odd.raw"), size=(1.5, 1.2), dpi=50, ffmpeg=fake_ffmpeg
+        )
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from filters import FILTERS, EmaFilter, MedianFilter, StreamFilter
+
+
+def test_stream_filter_is_abstract():
+    with pytest.raises(TypeError):
+        StreamFilter()
+
+
+def test_ema_matches_recurrence():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0, 1, (20, 2, 3))
+    ema = EmaFilter(alpha=0.25)
+    expected = values[0]
+    for index, frame in enumerate(values):
+        output = ema(np.full(2, index), frame)
+        if index:
+            expected = 0.25 * frame + 0.75 * expected
+        np.testing.assert_allclose(output, expected)
+
+
+def test_median_removes_isolated_spike():
+    median = MedianFilter(k=3)
+    values = np.zeros((6, 1, 3))
+    values[3] = 1000
+    outputs = [median(np.array([index]), frame) for index, frame in enumerate(values)]
+    np.testing.assert_array_equal(outputs, np.zeros((6, 1, 3)))
+
+
+@pytest.mark.parametrize("name", FILTERS)
+def test_repeated_samples_do_not_change_output(name):
+    noise_filter = FILTERS[name]()
+    rng = np.random.default_rng(1)
+    noise_filter(np.zeros(2), rng.normal(0, 1, (2, 3)))
+    first = noise_filter(np.array([1.0, 1.0]), rng.normal(0, 1, (2, 3)))
+    # Só o segundo microbit tem amostra nova
+    second = noise_filter(np.array([1.0, 2.0]), rng.normal(0, 1, (2, 3)))
+    np.testing.assert_array_equal(second[0], first[0])
+    np.testing.assert_array_equal(noise_filter(np.array([1.0, 2.0]), np.zeros((2, 3))), second)
@@ -0,0 +1,43 @@
+import numpy as np
+from kinematics import BASE_VECTOR, KinematicChain, angle_between, segment_rotations
+
+
+def random_norths(frames=200, devices=3, seed=0):
+    return np.random.default_rng(seed).normal(0, 400, (frames, devices, 3))
+
+
+def test_single_frame_matches_batch():
+    norths = random_norths(frames=5)
+    batch = segment_rotations(norths)
+    for frame, rotations in zip(norths, batch):
+        np.testing.assert_allclose(segment_rotations(frame), rotations, atol=1e-14)
+
+
+def test_segment_rotations_are_rotations():
+    rotations = segment_rotations(random_norths())
+    np.testing.assert_allclose(
+        rotations @ np.swapaxes(rotations, -1, -2),
+        np.broadcast_to(np.eye(3), rotations.shape),
+        atol=1e-12,
+    )
+    np.testing.assert_allclose(np.linalg.det(rotations), 1, atol=1e-12)
+
+
+def test_angle_between_is_counterclockwise():
+    angles = angle_between(np.array([[1.0, 0.0]] * 3), np.array([[0, 1.0], [0, -1.0], [-1.0, 0]]))
+    np.testing.assert_allclose(angles, [np.pi / 2, 3 * np.pi / 2, np.pi])
+
+
+def test_chain_positions_are_cumulative_segment_offsets():
+    norths = random_norths(frames=10)
+    chain = KinematicChain([1.0, 2.0, 0.5])
+    chain.set_rotations(segment_rotations(norths))
+    offsets = chain.vectors * chain.lengths[:, None]
+    np.testing.assert_allclose(chain.positions[:, 0], 0)
+    np.testing.assert_allclose(np.diff(chain.positions, axis=1), offsets, atol=1e-12)
+
+
+def test_straight_chain_reaches_total_length():
+    chain = KinematicChain([1.0, 2.0, 3.0])
+    np.testing.assert_allclose(chain.positions[-1], 6 * BASE_VECTOR)
+    np.testing.assert_allclose(chain.angles, 0)
@@ -0,0 +1,89 @@
+import numpy as np
+from kinematics import BASE_VECTOR, relative_angles, segment_rotations
+from offline import iter_frames, joint_vectors
+
+
+# Ângulo anti-horário entre dois vetores 2D, como no get_angle original
+def baseline_get_angle(v1, v2):
+    v1_unit = v1 / np.linalg.norm(v1)
+    v2_unit = v2 / np.linalg.norm(v2)
+    angle = np.arccos(np.dot(v1_unit, v2_unit))
+    if v1_unit[0] * v2_unit[1] - v1_unit[1] * v2_unit[0] < 0:
+        angle = 2 * np.pi - angle
+    return angle
+
+
+# Vetores de um quadro pela matemática original de JointTracker.update,
+# segmento a segmento, incluindo as rotações finais phi e gama
+def baseline_vectors(norths):
+    vectors = [np.array([0, -1, 0])]
+    north0 = norths[0]
+    north0_yz = np.array([north0[1], north0[2]])
+    north0_yz = north0_yz / np.linalg.norm(north0_yz)
+    for northn in norths[1:]:
+        theta = baseline_get_angle(np.array([-1, 0]), np.array([northn[1], northn[2]]))
+        r = np.array(
+            [
+                [1, 0, 0],
+                [0, np.cos(theta), np.sin(theta)],
+                [0, -np.sin(theta), np.cos(theta)],
+            ]
+        )
+        vectors.append(np.dot(r, np.array([0, north0_yz[0], north0_yz[1]])))
+    phi = baseline_get_angle(np.array([north0[0], north0[1]]), np.array([0, -1]))
+    rphi = np.array(
+        [[np.cos(phi), -np.sin(phi), 0], [np.sin(phi), np.cos(phi), 0], [0, 0, 1]]
+    )
+    gama = baseline_get_angle(np.array([north0[1], north0[2]]), np.array([0, -1]))
+    rgama = np.array(
+        [[1, 0, 0], [0, np.cos(gama), -np.sin(gama)], [0, np.sin(gama), np.cos(gama)]]
+    )
+    return np.array([rgama @ rphi @ vector for vector in vectors])
+
+
+def random_norths(frames=200, devices=3, seed=0):
+    return np.random.default_rng(seed).normal(0, 400, (frames, devices, 3))
+
+
+def test_joint_vectors_match_baseline_per_frame():
+    norths = random_norths()
+    vectors, _ = joint_vectors(norths)
+    expected = np.array([baseline_vectors(frame) for frame in norths])
+    np.testing.assert_allclose(vectors, expected, atol=1e-12)
+
+
+def test_joint_vectors_angles_are_consecutive_relative_angles():
+    norths = random_norths()
+    vectors, angles = joint_vectors(norths)
+    rotations = segment_rotations(norths)
+    np.testing.assert_allclose(vectors, rotations @ BASE_VECTOR)
+    np.testing.assert_allclose(
+        angles, relative_angles(rotations[:, 1:], rotations[:, :-1])
+    )
+    assert angles.shape == (len(norths), norths.shape[1] - 1)
+
+
+def test_iter_frames_stops_at_shortest_device():
+    devices = [np.zeros((7, 3)), np.ones((9, 3))]
+    chunks = list(iter_frames(devices, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert all(chunk.shape[1:] == (2, 3) for chunk in chunks)
+
+
+def test_tracker_frame_matches_offline_pipeline():
+    from joint_tracker import JointTracker
+    from simulation import SimulatedMicrobit
+
+    tracker = JointTracker(
+        *[SimulatedMicrobit(str(i), latency=0, jitter=0, seed=i) for i in range(3)],
+        concurrent=False,
+    )
+    try:
+        for _ in range(5):
+            tracker.update()
+            norths = tracker.magnetometer_frame.axes.astype(float)
+            vectors, angles = joint_vectors(norths[None])
+            np.testing.assert_allclose(tracker.vectors, vectors[0], atol=1e-12)
+            np.testing.assert_allclose(tracker.angles_refn, angles[0], atol=1e-12)
+    finally:
+        tracker.close()
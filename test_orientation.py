@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from orientation import (
+    OrientationFilter,
+    filter_orientations,
+    matrix_to_quaternion,
+    quaternion_to_matrix,
+    triad,
+)
+
+
+def random_samples(frames=500, devices=2, seed=0):
+    rng = np.random.default_rng(seed)
+    accelerometer = rng.normal(0, 100, (frames, devices, 3)) + [0, 0, 1000]
+    magnetometer = rng.normal(0, 300, (frames, devices, 3))
+    return accelerometer, magnetometer
+
+
+def test_triad_is_a_rotation():
+    accelerometer, magnetometer = random_samples(frames=20)
+    r = triad(accelerometer, magnetometer)
+    identity = np.broadcast_to(np.eye(3), r.shape)
+    np.testing.assert_allclose(r @ np.swapaxes(r, -1, -2), identity, atol=1e-12)
+    np.testing.assert_allclose(np.linalg.det(r), 1, atol=1e-12)
+
+
+def test_quaternion_round_trip():
+    accelerometer, magnetometer = random_samples(frames=20)
+    r = triad(accelerometer, magnetometer)
+    np.testing.assert_allclose(quaternion_to_matrix(matrix_to_quaternion(r)), r, atol=1e-12)
+
+
+@pytest.mark.parametrize("gain", [0.05, 0.2, 0.9])
+def test_batch_filter_matches_streaming_filter(gain):
+    accelerometer, magnetometer = random_samples()
+    streaming = OrientationFilter(gain)
+    expected = np.array(
+        [streaming.update(a, m) for a, m in zip(accelerometer, magnetometer)]
+    )
+    batch = filter_orientations(accelerometer, magnetometer, gain, chunk_size=64)
+    np.testing.assert_allclose(batch, expected, atol=1e-12)
+
+
+def test_masked_devices_keep_their_state():
+    accelerometer, magnetometer = random_samples(frames=10)
+    orientation_filter = OrientationFilter(0.5)
+    orientation_filter.update(accelerometer[0], magnetometer[0])
+    before = orientation_filter.quaternion.copy()
+    for a, m in zip(accelerometer[1:], magnetometer[1:]):
+        orientation_filter.update(a, m, new=np.array([True, False]))
+    after = orientation_filter.quaternion
+    np.testing.assert_allclose(after[1], before[1])
+    assert not np.allclose(after[0], before[0])
+
+
+def test_repeated_sample_does_not_move_masked_filter():
+    accelerometer, magnetometer = random_samples(frames=2)
+    once = OrientationFilter(0.3)
+    repeated = OrientationFilter(0.3)
+    for orientation_filter in (once, repeated):
+        orientation_filter.update(accelerometer[0], magnetometer[0])
+        orientation_filter.update(accelerometer[1], magnetometer[1])
+    for _ in range(10):
+        repeated.update(accelerometer[1], magnetometer[1], new=np.array([False, False]))
+    np.testing.assert_allclose(repeated.quaternion, once.quaternion)
@@ -0,0 +1,55 @@
+import numpy as np
+from point_cloud import PointPyramid
+
+
+def random_points(count=5000, seed=0):
+    return np.random.default_rng(seed).uniform(-1, 1, (count, 3))
+
+
+def test_levels_preserve_counts_and_centroid():
+    points = random_points()
+    pyramid = PointPyramid.build([points], [-1] * 3, [1] * 3, depth=4)
+    assert pyramid.depth == 4
+    assert pyramid.total == len(points)
+    for level, (centroids, counts) in enumerate(pyramid.levels):
+        assert counts.sum() == len(points)
+        assert len(centroids) <= 8**level
+        np.testing.assert_allclose(
+            (centroids * counts[:, None]).sum(axis=0) / counts.sum(),
+            points.mean(axis=0),
+            atol=1e-5,
+        )
+
+
+def test_chunked_build_matches_single_build():
+    points = random_points()
+    points[::97] = np.nan
+    whole = PointPyramid.build([points], [-1] * 3, [1] * 3, depth=3)
+    chunked = PointPyramid.build(np.array_split(points, 7), [-1] * 3, [1] * 3, depth=3)
+    assert whole.total == chunked.total == np.count_nonzero(~np.isnan(points).any(axis=1))
+    for (a, a_counts), (b, b_counts) in zip(whole.levels, chunked.levels):
+        np.testing.assert_allclose(a, b, atol=1e-6)
+        np.testing.assert_array_equal(a_counts, b_counts)
+
+
+def test_query_picks_finest_level_within_budget():
+    pyramid = PointPyramid.build([random_points()], [-1] * 3, [1] * 3, depth=5)
+    level, centroids, counts = pyramid.query(100)
+    assert len(centroids) <= 100
+    assert len(pyramid.levels[level + 1][0]) > 100
+    # Numa região menor cabe um nível mais fino
+    lower, upper = np.full(3, -0.25), np.full(3, 0.25)
+    inner_level, inner, _ = pyramid.query(100, lower, upper)
+    assert inner_level > level
+    assert np.all((inner >= lower) & (inner <= upper))
+
+
+def test_save_and_load_check_fingerprint(tmp_path):
+    file_name = str(tmp_path / "pyramid.npz")
+    pyramid = PointPyramid.build([random_points()], [-1] * 3, [1] * 3, depth=3)
+    pyramid.save(file_name, {"size": 1})
+    loaded = PointPyramid.load(file_name, {"size": 1})
+    assert loaded.depth == pyramid.depth and loaded.total == pyramid.total
+    np.testing.assert_array_equal(loaded.levels[-1][0], pyramid.levels[-1][0])
+    assert PointPyramid.load(file_name, {"size": 2}) is None
+    assert PointPyramid.load(str(tmp_path / "missing.npz")) is None
@@ -0,0 +1,71 @@
+from time import sleep
+
+import numpy as np
+import pytest
+from joint_tracker import JointSnapshot
+from kinematics import BASE_VECTOR, segment_rotations
+from publisher import (
+    HEADER,
+    JointPublisher,
+    JointSubscriber,
+    decode_snapshot,
+    encode_snapshot,
+    payload_size,
+)
+
+
+def snapshot(frame=7, devices=3, seed=0):
+    rng = np.random.default_rng(seed)
+    rotations = segment_rotations(rng.normal(0, 400, (devices, 3)))
+    return JointSnapshot(
+        frame,
+        1700000000.25,
+        1700000000 + rng.random(devices),
+        rotations,
+        rotations @ BASE_VECTOR,
+        rng.random(devices - 1),
+        revision=3,
+    )
+
+
+def assert_same_snapshot(decoded, original):
+    assert (decoded.frame, decoded.revision) == (original.frame, original.revision)
+    assert decoded.timestamp == original.timestamp
+    np.testing.assert_array_equal(decoded.timestamps, original.timestamps)
+    # Orientações e ângulos viajam em float32
+    np.testing.assert_allclose(decoded.rotations, original.rotations, atol=1e-6)
+    np.testing.assert_allclose(decoded.vectors, original.vectors, atol=1e-6)
+    np.testing.assert_allclose(decoded.angles, original.angles, atol=1e-6)
+
+
+def test_encode_decode_round_trip():
+    original = snapshot()
+    message = encode_snapshot(original)
+    assert len(message) == HEADER.size + payload_size(3)
+    assert_same_snapshot(
+        decode_snapshot(message[: HEADER.size], message[HEADER.size :]), original
+    )
+
+
+def test_decode_rejects_other_versions():
+    message = bytearray(encode_snapshot(snapshot()))
+    message[4] += 1
+    with pytest.raises(ValueError):
+        decode_snapshot(bytes(message[: HEADER.size]), bytes(message[HEADER.size :]))
+
+
+def test_subscriber_receives_published_frames():
+    publisher = JointPublisher(port=0)
+    try:
+        with JointSubscriber(*publisher.address) as subscriber:
+            for _ in range(100):
+                if publisher.subscriptions:
+                    break
+                sleep(0.01)
+            originals = [snapshot(frame, seed=frame) for frame in range(3)]
+            for original in originals:
+                publisher.publish(original)
+            for original in originals:
+                assert_same_snapshot(subscriber.receive(), original)
+    finally:
+        publisher.close()
@@ -0,0 +1,107 @@
+from time import sleep
+
+import numpy as np
+import pytest
+from recording import (
+    Characteristic,
+    ColumnWriter,
+    PollingScheduler,
+    load_session,
+    record_microbits,
+    session_addresses,
+)
+from samples import SAMPLE_DTYPE
+from simulation import SimulatedMicrobit
+
+
+# Como o KaspersMicrobit, em que `address` é um método e não uma propriedade
+class MethodAddressMicrobit(SimulatedMicrobit):
+    def address(self):
+        return f"00:11:22:33:44:{self.name}"
+
+
+def test_column_writer_round_trip_across_chunks(tmp_path):
+    file_name = str(tmp_path / "column.bin")
+    writer = ColumnWriter(file_name, SAMPLE_DTYPE, None, chunk_size=4)
+    rows = np.zeros(10, dtype=SAMPLE_DTYPE)
+    rows["time"] = np.arange(10)
+    rows["x"] = np.arange(10) * 2
+    writer.append(rows[0])
+    writer.extend(rows[1:])
+    writer.close()
+    assert writer.rows == 10
+    np.testing.assert_array_equal(np.fromfile(file_name, dtype=SAMPLE_DTYPE), rows)
+
+
+def test_record_round_trip_with_method_address(tmp_path):
+    directory = str(tmp_path / "session")
+    microbits = [
+        MethodAddressMicrobit(name, latency=0.001, jitter=0, seed=seed)
+        for seed, name in enumerate(("aa", "bb"))
+    ]
+    sessions = record_microbits(
+        *microbits,
+        characteristics=[Characteristic.MAGNETOMETER, Characteristic.ACCELEROMETER],
+        time_length=0.3,
+        verbose=False,
+        directory=directory,
+        chunk_size=4,
+    )
+    assert session_addresses(directory) == ["00:11:22:33:44:aa", "00:11:22:33:44:bb"]
+    assert len(sessions) == len(load_session(directory)) == 2
+    for device, data in enumerate(sessions):
+        for characteristic in (Characteristic.MAGNETOMETER, Characteristic.ACCELEROMETER):
+            values = data[characteristic]
+            times = data[f"{characteristic.name}_TIME"]
+            assert len(values) > 0
+            assert values.shape == (len(times), 3)
+            assert np.all(np.diff(times) > 0)
+        assert np.all(data["MAGNETOMETER_SAMPLES"]["device"] == device)
+
+
+# Recorder falso que anota a ordem das leituras, cada uma levando 2 ms, e
+# para o escalonador depois de 20 leituras
+class FakeRecorder:
+    address = "00:11:22:33:44:55"
+    device = 0
+
+    def __init__(self, characteristics, scheduler_stop):
+        self.readers = dict.fromkeys(characteristics)
+        self.scheduler_stop = scheduler_stop
+        self.order = []
+
+    def read(self, characteristic):
+        sleep(0.002)
+        self.order.append(characteristic)
+        if len(self.order) >= 20:
+            self.scheduler_stop.set()
+
+
+def poll_order(characteristics, **settings):
+    scheduler = PollingScheduler([], **settings)
+    recorder = FakeRecorder(characteristics, scheduler.stop_event)
+    scheduler.poll(recorder)
+    return recorder.order
+
+
+def test_scheduler_reads_highest_priority_among_due():
+    accelerometer, temperature = Characteristic.ACCELEROMETER, Characteristic.TEMPERATURE
+    # Leituras mais lentas que as taxas: as duas estão sempre atrasadas
+    order = poll_order(
+        [accelerometer, temperature],
+        rates={accelerometer: 1000.0, temperature: 1000.0},
+        priorities={accelerometer: 0, temperature: 5},
+    )
+    assert set(order) == {temperature}
+
+
+def test_scheduler_rate_zero_disables_and_overrides_by_address():
+    accelerometer, magnetometer = Characteristic.ACCELEROMETER, Characteristic.MAGNETOMETER
+    order = poll_order(
+        [accelerometer, magnetometer],
+        rates={accelerometer: 1000.0, magnetometer: 1000.0},
+        device_rates={"00:11:22:33:44:55": {magnetometer: 0}},
+    )
+    assert set(order) == {accelerometer}
+    with pytest.raises(ValueError):
+        PollingScheduler([], rates={accelerometer: -1.0})
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from joint_tracker import JointTracker
+from recording import Characteristic, SessionWriter, load_session
+from replay import ReplayMicrobit
+from samples import SAMPLE_DTYPE
+
+SAMPLES = 50
+
+
+# Sessão sintética de 2 microbits com SAMPLES amostras de magnetômetro
+@pytest.fixture
+def session(tmp_path):
+    directory = str(tmp_path / "session")
+    writer = SessionWriter(directory)
+    rng = np.random.default_rng(0)
+    for device in range(2):
+        writer.add_device(f"simulated:{device}")
+        samples = np.zeros(SAMPLES, dtype=SAMPLE_DTYPE)
+        samples["time"] = np.arange(SAMPLES) * 0.001 + 0.0001 * device
+        samples["x"] = 150
+        samples["y"] = rng.integers(-400, 400, SAMPLES)
+        samples["z"] = rng.integers(-400, 400, SAMPLES)
+        samples["device"] = device
+        writer.column(device, Characteristic.MAGNETOMETER.name, SAMPLE_DTYPE, None).extend(
+            samples
+        )
+    writer.close()
+    return directory
+
+
+def test_replay_finishes_after_last_sample(session):
+    microbit = ReplayMicrobit(session, speed=None)
+    microbit.connect()
+    values = [microbit.magnetometer.read_data() for _ in range(SAMPLES)]
+    assert microbit.finished
+    # Depois do fim, repete a última amostra
+    assert microbit.magnetometer.read_data() == values[-1]
+    looping = ReplayMicrobit(session, speed=None, loop=True)
+    looping.connect()
+    for _ in range(SAMPLES):
+        looping.magnetometer.read_data()
+    assert not looping.finished
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_tracker_stops_when_replays_finish(session, streaming):
+    tracker = JointTracker(
+        *[ReplayMicrobit(session, device, speed=1.0) for device in range(2)],
+        streaming=streaming,
+    )
+    tracker.start()
+    tracker.thread.join(timeout=5)
+    try:
+        assert not tracker.running
+        assert tracker.finished
+        # O último quadro usa a última amostra de cada microbit
+        last = [data[Characteristic.MAGNETOMETER][-1] for data in load_session(session)]
+        np.testing.assert_array_equal(tracker.magnetometer_frame.axes, last)
+    finally:
+        tracker.close()
@@ -0,0 +1,43 @@
+import numpy as np
+from orientation import matrix_to_quaternion, quaternion_to_matrix
+from resample import align, common_time_base, resample_linear, resample_slerp
+
+
+def rotation_z(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, -s, 0], [s, c, 0], [0, 0, 1]])
+
+
+def test_linear_interpolates_and_holds_ends():
+    times = np.array([0.0, 1.0, 3.0])
+    values = np.array([[0.0, 0.0], [2.0, 4.0], [6.0, 0.0]])
+    resampled = resample_linear(times, values, [-1.0, 0.5, 2.0, 5.0])
+    np.testing.assert_allclose(resampled, [[0, 0], [1, 2], [4, 2], [6, 0]])
+
+
+def test_slerp_interpolates_the_rotation_angle():
+    quaternions = matrix_to_quaternion(np.stack([rotation_z(0), rotation_z(np.pi / 2)]))
+    # q e -q são a mesma rotação: o slerp segue o caminho mais curto
+    quaternions[1] *= -1
+    resampled = resample_slerp([0.0, 1.0], quaternions, [0.25, 0.5, 2.0])
+    np.testing.assert_allclose(np.linalg.norm(resampled, axis=-1), 1)
+    np.testing.assert_allclose(
+        quaternion_to_matrix(resampled),
+        [rotation_z(np.pi / 8), rotation_z(np.pi / 4), rotation_z(np.pi / 2)],
+        atol=1e-12,
+    )
+
+
+def test_align_covers_common_interval_in_chunks():
+    times_list = [np.arange(0, 2, 0.1), np.arange(0.05, 2.5, 0.1)]
+    values_list = [times[:, None] * [1.0, 2.0, 3.0] for times in times_list]
+    chunks = list(align(times_list, values_list, rate=20.0, chunk_size=7))
+    new_times = np.concatenate([times for times, _ in chunks])
+    values = np.concatenate([chunk for _, chunk in chunks])
+    np.testing.assert_allclose(new_times, common_time_base(times_list, 20.0))
+    np.testing.assert_allclose(new_times[[0, -1]], [0.05, 1.9])
+    assert [len(times) for times, _ in chunks] == [7] * 5 + [3]
+    assert values.shape == (len(new_times), 2, 3)
+    # Valores lineares no tempo são reproduzidos exatamente por todos os fluxos
+    expected = new_times[:, None, None] * [1.0, 2.0, 3.0]
+    np.testing.assert_allclose(values, np.broadcast_to(expected, values.shape), atol=1e-12)
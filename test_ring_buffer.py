@@ -0,0 +1,38 @@
+import numpy as np
+from ring_buffer import RingBuffer
+
+
+def reference(buffer_input, capacity):
+    times = np.concatenate([times for times, _ in buffer_input])
+    values = np.concatenate([values for _, values in buffer_input])
+    return times[-capacity:], values[-capacity:]
+
+
+def test_extend_matches_appends_across_wraps():
+    rng = np.random.default_rng(0)
+    extended = RingBuffer(5)
+    appended = RingBuffer(5)
+    blocks = []
+    # Blocos menores, iguais e maiores que a capacidade
+    for size in (2, 3, 5, 1, 7, 4):
+        times = rng.random(size).cumsum() + (blocks[-1][0][-1] if blocks else 0)
+        values = rng.normal(0, 1, (size, 3))
+        blocks.append((times, values))
+        extended.extend(times, values)
+        for timestamp, row in zip(times, values):
+            appended.append(timestamp, row)
+        expected_times, expected_values = reference(blocks, 5)
+        np.testing.assert_array_equal(extended.times(), expected_times)
+        np.testing.assert_array_equal(extended.values(), expected_values)
+        np.testing.assert_array_equal(extended.times(), appended.times())
+        assert extended.count == appended.count
+        assert extended.last()[0] == expected_times[-1]
+
+
+def test_window_before_full():
+    buffer = RingBuffer(4, width=2)
+    buffer.extend([1.0, 2.0], [[1, 1], [2, 2]])
+    assert len(buffer) == 2
+    np.testing.assert_array_equal(buffer.times(), [1.0, 2.0])
+    np.testing.assert_array_equal(buffer.values(1), [[2, 2]])
+    np.testing.assert_array_equal(buffer.times(10), [1.0, 2.0])
@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import session_loader
+from recording import Characteristic
+from session_loader import load_recording, norm_key, unit_key
+
+MAGNETOMETER = Characteristic.MAGNETOMETER
+
+
+# Tabela no layout de export_excel; valores de três dígitos, para que tabelas
+# de sementes diferentes tenham o mesmo tamanho
+def write_table(file_name, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(100, 1000, (rows, 3))
+    pd.DataFrame(
+        {
+            "MAGNETOMETER_X": values[:, 0],
+            "MAGNETOMETER_Y": values[:, 1],
+            "MAGNETOMETER_Z": values[:, 2],
+            "MAGNETOMETER_TIME": np.arange(rows) * 0.02,
+        }
+    ).to_csv(file_name, index=False)
+    return values
+
+
+def test_table_is_cached_with_derived_columns(tmp_path, monkeypatch):
+    file_name = str(tmp_path / "table.csv")
+    values = write_table(file_name, 10)
+    data = load_recording(file_name, chunk_size=4)
+    np.testing.assert_array_equal(data[MAGNETOMETER], values)
+    norms = np.linalg.norm(values, axis=1)
+    np.testing.assert_allclose(data[norm_key(MAGNETOMETER)], norms)
+    np.testing.assert_allclose(data[unit_key(MAGNETOMETER)], values / norms[:, None])
+    assert isinstance(data[MAGNETOMETER], np.memmap)
+
+    # Com o cache válido a tabela não é lida de novo
+    def fail(file_name):
+        raise AssertionError("the table was read again")
+
+    monkeypatch.setattr(session_loader, "_read_table", fail)
+    np.testing.assert_array_equal(load_recording(file_name)[MAGNETOMETER], values)
+
+
+@pytest.mark.parametrize("validate", ["mtime", "hash"])
+def test_cache_is_rebuilt_when_the_source_changes(tmp_path, validate):
+    file_name = str(tmp_path / "table.csv")
+    original = write_table(file_name, 10, seed=0)
+    load_recording(file_name, validate=validate)
+    info = os.stat(file_name)
+    # Mesmo tamanho e mesmo mtime: só o hash percebe a mudança
+    changed = write_table(file_name, 10, seed=1)
+    os.utime(file_name, ns=(info.st_atime_ns, info.st_mtime_ns))
+    assert os.stat(file_name).st_size == info.st_size
+    np.testing.assert_array_equal(
+        load_recording(file_name, validate=validate)[MAGNETOMETER],
+        changed if validate == "hash" else original,
+    )
+    # Com outro mtime, qualquer validação refaz o cache
+    os.utime(file_name, ns=(info.st_atime_ns, info.st_mtime_ns + 10**9))
+    np.testing.assert_array_equal(
+        load_recording(file_name, validate=validate)[MAGNETOMETER], changed
+    )
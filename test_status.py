@@ -0,0 +1,38 @@
+import io
+import logging
+
+import numpy as np
+import pytest
+from status import CallbackStatus, LogStatus, NullStatus, StatusSink, TerminalStatus
+
+
+def test_status_sink_is_abstract():
+    with pytest.raises(TypeError):
+        StatusSink()
+
+
+def test_due_is_throttled_by_rate():
+    status = CallbackStatus(lambda fields: None, rate=1.0)
+    assert status.due()
+    assert not status.due()
+    assert CallbackStatus(lambda fields: None).due()
+    assert not NullStatus().due()
+
+
+def test_terminal_status_rewrites_one_line():
+    stream = io.StringIO()
+    status = TerminalStatus(stream=stream)
+    status.emit({"frame": 10, "angles": np.array([12.34, 56.78])})
+    status.emit({"frame": 1})
+    first, second = stream.getvalue().split("\r")[1:]
+    assert first == "frame=10  angles=[12.3 56.8]"
+    assert second == "frame=1".ljust(len(first))
+
+
+def test_callback_and_log_status_receive_fields(caplog):
+    received = []
+    CallbackStatus(received.append).emit({"frame": 1})
+    assert received == [{"frame": 1}]
+    with caplog.at_level(logging.INFO, logger="microbit_tracker"):
+        LogStatus().emit({"frame": 2})
+    assert caplog.records[-1].status == {"frame": 2}